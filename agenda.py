@@ -0,0 +1,111 @@
+import datetime
+from functools import lru_cache
+from typing import List, Optional
+import pytz
+
+# === Einstellungen ===
+TZ = pytz.timezone("Europe/Berlin")
+TELEGRAM_LIMIT = 4096
+
+
+# === Zeitangaben ===
+@lru_cache(maxsize=4096)
+def parse_time(value: str) -> datetime.datetime:
+    """ISO-Zeitpunkt bzw. Datum (ganztägig) als Zeitpunkt in Europe/Berlin.
+
+    Gecacht, weil dieselben Termine von mehreren Zusammenfassungen gerendert werden.
+    """
+    if len(value) == 10:
+        return TZ.localize(datetime.datetime.fromisoformat(value))
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(TZ)
+
+
+def day_bounds(day: datetime.date):
+    start = TZ.localize(datetime.datetime.combine(day, datetime.time()))
+    end = TZ.localize(datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time()))
+    return start, end
+
+
+def _hhmm(value: datetime.datetime) -> str:
+    return f"{value.hour:02d}:{value.minute:02d}"
+
+
+def format_time(start: datetime.datetime, end: datetime.datetime, all_day: bool, day_start, day_end) -> str:
+    """Zeitangabe eines Termins für den Tag [day_start, day_end), auch für mehrtägige Termine."""
+    if all_day:
+        return "(ganztägig)"
+    starts_today = start >= day_start
+    ends_today = end <= day_end
+    if starts_today and ends_today:
+        return f"{_hhmm(start)}-{_hhmm(end)}"
+    if starts_today:
+        return f"ab {_hhmm(start)}"
+    if ends_today:
+        return f"bis {_hhmm(end)}"
+    return "(ganztägig)"
+
+
+# === Rendern ===
+def render_agenda(
+    events: list,
+    day: datetime.date,
+    header: Optional[str] = None,
+    empty_text: str = "Keine Termine.",
+    calendar_format: str = "\n📘 {calendar}:",
+    event_format: str = "- {time} {summary}",
+) -> str:
+    """Termine eines Tages gruppiert nach Kalender, chronologisch sortiert.
+
+    Kalender erscheinen in der Reihenfolge ihres ersten Termins. Ohne Termine wird
+    `empty_text` unter dem Header ausgegeben.
+    """
+    parsed = [(parse_time(e["start"]), parse_time(e["end"]), len(e["start"]) == 10, e) for e in events]
+    parsed.sort(key=lambda p: (p[0], p[1]))
+    day_start, day_end = day_bounds(day)
+
+    grouped = {}
+    for item in parsed:
+        grouped.setdefault(item[3].get("calendar", "Unbekannt"), []).append(item)
+
+    lines = [header] if header is not None else []
+    if not grouped:
+        lines.append(empty_text)
+    for cal_name, items in grouped.items():
+        lines.append(calendar_format.format(calendar=cal_name))
+        for start, end, all_day, e in items:
+            lines.append(event_format.format(time=format_time(start, end, all_day, day_start, day_end), summary=e["summary"]))
+    return "\n".join(lines) + "\n"
+
+
+# === Telegram ===
+def split_message(text: str, limit: int = TELEGRAM_LIMIT) -> List[str]:
+    """Teilt Text an Zeilengrenzen in Nachrichten von höchstens `limit` Zeichen."""
+    if len(text) <= limit:
+        return [text]
+
+    chunks = []
+    current = []
+    size = 0
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            chunks.append(line[:limit])
+            line = line[limit:]
+        added = len(line) + (1 if current else 0)
+        if size + added > limit:
+            chunks.append("\n".join(current))
+            current, size = [line], len(line)
+        else:
+            current.append(line)
+            size += added
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+async def send_chunks(send, text: str, **kwargs):
+    """Sendet langen Text über `send` (z. B. reply_text oder bot.send_message) in mehreren Teilen."""
+    for chunk in split_message(text):
+        await send(text=chunk, **kwargs)
@@ -0,0 +1,64 @@
+import os
+import time
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import outbound_policy
+# HTTP_TIMEOUT wird in outbound_policy festgelegt und von den Clients hier importiert
+from outbound_policy import HTTP_TIMEOUT
+
+# === Einstellungen ===
+IO_MAX_WORKERS = int(os.getenv("IO_MAX_WORKERS", "16"))
+
+# Dienst -> (max. parallele Aufrufe, Timeout in Sekunden)
+SERVICE_LIMITS = {
+    "calendar": (8, 30),
+    "gmail": (8, 60),
+    "todoist": (4, 20),
+    "coingecko": (2, 15),
+}
+DEFAULT_LIMIT = (4, 30)
+
+_executor = ThreadPoolExecutor(max_workers=IO_MAX_WORKERS, thread_name_prefix="io")
+_semaphores = {}
+
+
+def _get_semaphore(service: str) -> asyncio.Semaphore:
+    semaphore = _semaphores.get(service)
+    if semaphore is None:
+        limit, _ = SERVICE_LIMITS.get(service, DEFAULT_LIMIT)
+        semaphore = asyncio.Semaphore(limit)
+        _semaphores[service] = semaphore
+    return semaphore
+
+
+async def run_io(service: str, func, *args, **kwargs):
+    """Führt einen blockierenden Aufruf im I/O-Threadpool aus, damit der Event-Loop frei bleibt.
+
+    Die einzelnen HTTP-Anfragen darin laufen über outbound_policy (Rate-Limit, Wiederholungen,
+    Circuit Breaker); Wiederholungen werden nur versucht, solange sie noch in den Timeout passen.
+    """
+    _, timeout = SERVICE_LIMITS.get(service, DEFAULT_LIMIT)
+    loop = asyncio.get_running_loop()
+    semaphore = _get_semaphore(service)
+    await semaphore.acquire()
+    call = functools.partial(outbound_policy.with_deadline, time.monotonic() + timeout, func, *args, **kwargs)
+    try:
+        future = loop.run_in_executor(_executor, call)
+    except BaseException:
+        semaphore.release()
+        raise
+
+    def finished(done):
+        # Den Platz erst freigeben, wenn der Thread wirklich fertig ist (auch nach einem Timeout)
+        semaphore.release()
+        if not done.cancelled():
+            done.exception()
+
+    future.add_done_callback(finished)
+    try:
+        # shield: ein Timeout darf den Future nicht als erledigt markieren, solange der Thread läuft
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"{service}: keine Antwort nach {timeout:.0f}s")
@@ -0,0 +1,70 @@
+"""Misst agenda.render_agenda gegen die frühere Schleife mit String-Slicing und `+=`.
+
+Aufruf: python benchmarks/bench_agenda.py [Kalender] [Termine je Kalender]
+"""
+import os
+import sys
+import time
+import random
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from agenda import render_agenda, split_message
+
+DAY = datetime.date(2026, 10, 20)
+
+
+def make_events(calendars: int, per_calendar: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    events = []
+    for c in range(calendars):
+        for i in range(per_calendar):
+            if rng.random() < 0.1:
+                start, end = DAY.isoformat(), (DAY + datetime.timedelta(days=1)).isoformat()
+            else:
+                hour = rng.randint(0, 22)
+                start = f"{DAY.isoformat()}T{hour:02d}:{rng.choice(['00', '15', '30', '45'])}:00+02:00"
+                end = f"{DAY.isoformat()}T{hour + 1:02d}:00:00+02:00"
+            events.append({"summary": f"Termin {c}-{i}", "start": start, "end": end, "calendar": f"Kalender {c}"})
+    return events
+
+
+def legacy(events: list) -> str:
+    grouped = {}
+    for e in events:
+        grouped.setdefault(e.get("calendar", "Unbekannt"), []).append(e)
+    msg = "🗓️ Termine heute:\n"
+    for cal_name, evts in grouped.items():
+        msg += f"\n📘 {cal_name}:\n"
+        for e in evts:
+            start_str = e['start'][11:16] if 'T' in e['start'] else ''
+            end_str = e['end'][11:16] if 'T' in e['end'] else ''
+            zeit = f"{start_str}-{end_str}" if start_str and end_str else "(ganztägig)"
+            msg += f"- {zeit} {e['summary']}\n"
+    return msg
+
+
+def renderer(events: list) -> str:
+    return render_agenda(events, DAY, header="🗓️ Termine heute:")
+
+
+def timed(func, *args, repeat: int = 200):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    calendars = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    per_calendar = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    events = make_events(calendars, per_calendar)
+    text = renderer(events)
+
+    print(f"{len(events)} Termine in {calendars} Kalendern, {len(text)} Zeichen, {len(split_message(text))} Nachricht(en)")
+    print(f"alte Schleife:   {timed(legacy, events) * 1e6:8.1f} µs")
+    print(f"render_agenda:   {timed(renderer, events) * 1e6:8.1f} µs")
+    print(f"split_message:   {timed(split_message, text) * 1e6:8.1f} µs")
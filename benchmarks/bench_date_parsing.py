@@ -0,0 +1,62 @@
+"""Misst date_parsing.find_dates (Schnellpfad, ungecacht und gecacht) gegen dateparser.search_dates.
+
+Aufruf: python benchmarks/bench_date_parsing.py [Wiederholungen]
+"""
+import os
+import sys
+import time
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import date_parsing
+from date_parsing import find_dates, normalize
+
+TODAY = datetime.date(2026, 10, 18)
+
+# Typische Nachrichten an den Bot, inkl. solcher ohne Datum und einem Fallback-Fall
+MESSAGES = [
+    "Was habe ich heute?",
+    "Termine morgen",
+    "und übermorgen?",
+    "Was ist am Freitag los",
+    "nächsten Montag Zahnarzt?",
+    "am 12.11.",
+    "Was steht am 5. November an?",
+    "in 3 Tagen",
+    "Danke!",
+    "Hallo wie geht's",
+    "nächste Woche",
+]
+
+
+def timed(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for text in MESSAGES:
+            func(text)
+    return (time.perf_counter() - started) / (repeat * len(MESSAGES)) * 1e6
+
+
+def dateparser_only(text: str):
+    return date_parsing._dateparser(normalize(text), TODAY)
+
+
+def uncached(text: str):
+    date_parsing._cache.clear()
+    return find_dates(text, TODAY)
+
+
+def cached(text: str):
+    return find_dates(text, TODAY)
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    dateparser_only(MESSAGES[0])  # Import und Sprachdaten nicht mitmessen
+
+    fallbacks = sum(not date_parsing.fast_parse(normalize(t), TODAY)[1] for t in MESSAGES)
+    print(f"{len(MESSAGES)} Nachrichten, davon {fallbacks} mit dateparser-Fallback")
+    print(f"dateparser.search_dates: {timed(dateparser_only, repeat):10.1f} µs/Nachricht")
+    print(f"find_dates ungecacht:    {timed(uncached, repeat):10.1f} µs/Nachricht")
+    print(f"find_dates gecacht:      {timed(cached, repeat):10.1f} µs/Nachricht")
@@ -0,0 +1,56 @@
+"""Vergleicht einzelne requests.get-Aufrufe mit dem gemeinsamen Keep-Alive-Pool aus http_session.
+
+Misst gegen einen lokalen HTTP/1.1-Server (ohne TLS, daher nur der TCP-Anteil der Ersparnis;
+bei HTTPS entfällt pro wiederverwendeter Verbindung zusätzlich der TLS-Handshake).
+
+Aufruf: python benchmarks/bench_http_session.py [Anfragen]
+"""
+import os
+import sys
+import time
+import threading
+import socketserver
+import http.server
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import requests
+import http_session
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+
+def timed(get, url: str, count: int) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        get(url)
+    return (time.perf_counter() - started) / count * 1000
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    print(f"requests.get einzeln:  {timed(requests.get, url, count):6.3f} ms/Anfrage")
+    print(f"http_session (Pool):   {timed(lambda u: http_session.session().get(u), url, count):6.3f} ms/Anfrage")
+    print(http_session.summary())
+    server.shutdown()
@@ -0,0 +1,44 @@
+"""Zeigt Cache und Zusammenlegung im llm_gateway mit dem FakeBackend (ohne Netz).
+
+Simuliert den Tagesablauf: mehrere gleichzeitige /xrp-Aufrufe, danach weitere innerhalb
+der Cache-Zeit. Aufruf: python benchmarks/bench_llm_gateway.py [gleichzeitige Aufrufe] [Latenz s]
+"""
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import llm_gateway
+from llm_gateway import FakeBackend
+
+MESSAGES = [
+    {"role": "system", "content": "Du bist ein sachlicher Nachrichten-Assistent."},
+    {"role": "user", "content": "Gibt es neue Nachrichten zu XRP oder Ripple?"},
+]
+
+
+async def run(concurrent: int, latency: float):
+    backend = FakeBackend(delay=latency)
+    llm_gateway.set_backend(backend)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(llm_gateway.complete(MESSAGES, temperature=0.3) for _ in range(concurrent)))
+    burst = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(concurrent):
+        await llm_gateway.complete(MESSAGES, temperature=0.3)
+    cached = time.perf_counter() - started
+
+    print(f"{concurrent} gleichzeitige Aufrufe: {burst * 1000:8.1f} ms, Backend-Aufrufe: {len(backend.calls)}")
+    print(f"{concurrent} Aufrufe aus dem Cache: {cached * 1000:8.3f} ms, Backend-Aufrufe: {len(backend.calls)}")
+    print(f"ohne Gateway wären es {2 * concurrent} Aufrufe à {latency:.2f} s gewesen")
+    print(llm_gateway.summary())
+
+
+if __name__ == "__main__":
+    concurrent = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    asyncio.run(run(concurrent, latency))
@@ -0,0 +1,73 @@
+"""Vergleicht die naive Stichwortsuche (eine `in`-Suche je Phrase) mit mail_classifier.
+
+Aufruf: python benchmarks/bench_mail_classifier.py [Anzahl Nachrichten]
+"""
+import os
+import sys
+import json
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import mail_classifier
+
+WORDS = (
+    "hallo danke gestern morgen projekt termin rechnung angebot bericht meeting kurz info "
+    "hello thanks report invoice schedule update team draft review note quick lunch"
+).split()
+
+
+def make_corpus(config: dict, size: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    phrases = [p.lower() for phrases in config.values() for p in phrases]
+    corpus = []
+    for _ in range(size):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(20, 120))]
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words)), rng.choice(phrases))
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def naive(config: dict, corpus: list) -> list:
+    lists = {name: [p.lower() for p in phrases] for name, phrases in config.items()}
+    return [
+        [any(p in text for p in phrases) for phrases in lists.values()]
+        for text in corpus
+    ]
+
+
+def compiled(config: dict, corpus: list) -> list:
+    names = list(config)
+    results = []
+    for text in corpus:
+        found = mail_classifier.classify(text)
+        results.append([name in found for name in names])
+    return results
+
+
+def timed(func, *args, repeat: int = 5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with open(mail_classifier.FILTERS_FILE, encoding="utf-8") as f:
+        config = json.load(f)
+    mail_classifier.load_patterns()
+    corpus = make_corpus(config, size)
+
+    naive_time, naive_result = timed(naive, config, corpus)
+    compiled_time, compiled_result = timed(compiled, config, corpus)
+    assert naive_result == compiled_result, "Ergebnisse weichen voneinander ab"
+
+    print(f"{size} Nachrichten, {sum(len(v) for v in config.values())} Phrasen")
+    print(f"naiv (in-Suche):   {naive_time * 1000:8.1f} ms")
+    print(f"Trie-Automat:      {compiled_time * 1000:8.1f} ms")
+    print(f"Faktor:            {naive_time / compiled_time:8.1f}x")
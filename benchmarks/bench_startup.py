@@ -0,0 +1,56 @@
+"""Misst die Importzeit von main.py mit `python -X importtime` in frischen Prozessen.
+
+Zeigt die Gesamtzeit (bester von N Läufen), die teuersten direkt importierten Module und
+ob die schweren Bibliotheken erst bei Bedarf geladen werden.
+
+Aufruf: python benchmarks/bench_startup.py [Läufe] [Top-N]
+"""
+import os
+import re
+import sys
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Sollen beim Import von main.py noch nicht geladen sein
+LAZY_MODULES = ["dateparser", "googleapiclient.discovery", "openai", "sqlalchemy", "todoist_api_python", "requests"]
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def importtime(module: str = "main") -> list:
+    check = "; ".join(f"print('LOADED', {name!r}, {name!r} in sys.modules)" for name in LAZY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import sys, {module}; {check}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    loaded = {parts[1]: parts[2] == "True" for parts in (l.split() for l in result.stdout.splitlines() if l.startswith("LOADED"))}
+    return entries, loaded
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    best = None
+    for _ in range(runs):
+        entries, loaded = importtime()
+        total = next(cum for name, _, cum, depth in entries if name == "main" and depth == 0)
+        if best is None or total < best[0]:
+            best = (total, entries, loaded)
+
+    total, entries, loaded = best
+    print(f"import main: {total / 1000:.0f} ms (bester von {runs} Läufen)")
+    print("\nTeuerste direkte Importe:")
+    direct = sorted((e for e in entries if e[3] == 1), key=lambda e: e[2], reverse=True)
+    for name, _, cumulative, _ in direct[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    print("\nErst bei Bedarf geladen:")
+    for name in LAZY_MODULES:
+        print(f"  {'❌ schon geladen' if loaded.get(name) else '✅ lazy':16} {name}")
@@ -0,0 +1,129 @@
+import asyncio
+import datetime
+import calendar_store
+import single_flight
+from async_io import run_io
+from google_services import calendar_service
+
+
+# === Google Calendar API (blockierend, läuft im I/O-Pool) ===
+def list_calendars() -> list:
+    service = calendar_service()
+    calendars = []
+    page_token = None
+    while True:
+        result = service.calendarList().list(pageToken=page_token).execute()
+        calendars.extend(result.get("items", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return calendars
+
+
+def list_events(calendar_id: str, start, end) -> list:
+    service = calendar_service()
+    events = []
+    page_token = None
+    while True:
+        result = service.events().list(
+            calendarId=calendar_id,
+            timeMin=start.isoformat(),
+            timeMax=end.isoformat(),
+            singleEvents=True,
+            orderBy="startTime",
+            pageToken=page_token,
+        ).execute()
+        events.extend(result.get("items", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return events
+
+
+def to_event_dict(event: dict, cal_name: str) -> dict:
+    title = event.get("summary", "(kein Titel)")
+    start_time = event.get("start", {}).get("dateTime") or event.get("start", {}).get("date")
+    end_time = event.get("end", {}).get("dateTime") or event.get("end", {}).get("date")
+    return {
+        "summary": title,
+        "start": start_time,
+        "end": end_time,
+        "calendar": cal_name
+    }
+
+
+def events_between(events: list, start, end) -> list:
+    """Filtert bereits geladene Termine auf den Zeitraum [start, end), Reihenfolge bleibt erhalten."""
+    return [
+        e for e in events
+        if calendar_store.parse_event_time(e["start"]) < end and calendar_store.parse_event_time(e["end"]) > start
+    ]
+
+
+# === Kalenderintegration ===
+async def get_calendar_events(start, end) -> list:
+    """Termine aller Kalender im Zeitraum.
+
+    Liegt der Zeitraum im synchronisierten Fenster, wird aus dem lokalen Bestand
+    (calendar_store) geantwortet; sonst werden die Kalender parallel live abgefragt.
+    Gleichzeitige Anfragen für denselben Zeitraum teilen sich einen Abruf.
+    """
+    return await single_flight.do(("calendar", "events", (start.isoformat(), end.isoformat())), _load_calendar_events, start, end)
+
+
+def day_ranges(days) -> list:
+    """Fasst Tage zu zusammenhängenden Bereichen [(erster, letzter), ...] zusammen."""
+    ranges = []
+    for day in sorted(set(days)):
+        if ranges and day - ranges[-1][1] == datetime.timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+async def get_events_by_day(days) -> dict:
+    """Termine je Tag (Datum -> Liste) für beliebige, auch weit auseinanderliegende Tage.
+
+    Jeder zusammenhängende Bereich wird einzeln geladen, damit "heute … am 1.6." nicht
+    den ganzen Zeitraum dazwischen abfragt.
+    """
+    tz = calendar_store.TZ
+    bounds = [
+        (tz.localize(datetime.datetime.combine(first, datetime.time())),
+         tz.localize(datetime.datetime.combine(last + datetime.timedelta(days=1), datetime.time())))
+        for first, last in day_ranges(days)
+    ]
+    results = await asyncio.gather(*(get_calendar_events(start, end) for start, end in bounds))
+
+    by_day = {}
+    for (first, last), events in zip(day_ranges(days), results):
+        day = first
+        while day <= last:
+            next_day = day + datetime.timedelta(days=1)
+            day_start = tz.localize(datetime.datetime.combine(day, datetime.time()))
+            day_end = tz.localize(datetime.datetime.combine(next_day, datetime.time()))
+            by_day[day] = events_between(events, day_start, day_end)
+            day = next_day
+    return by_day
+
+
+async def _load_calendar_events(start, end) -> list:
+    try:
+        await calendar_store.sync()
+        if calendar_store.covers(start, end):
+            return calendar_store.lookup(start, end)
+    except Exception as e:
+        print(f"⚠️ Kalender-Sync fehlgeschlagen, frage live ab: {e}")
+
+    calendars = await run_io("calendar", list_calendars)
+
+    # Die Parallelität wird durch das Kalender-Limit in async_io.SERVICE_LIMITS begrenzt
+    results = await asyncio.gather(
+        *(run_io("calendar", list_events, cal["id"], start, end) for cal in calendars)
+    )
+
+    events_output = []
+    for cal, events in zip(calendars, results):
+        cal_name = cal.get("summary", "(kein Name)")
+        for event in events:
+            events_output.append(to_event_dict(event, cal_name))
+    return events_output
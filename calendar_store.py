@@ -0,0 +1,236 @@
+import os
+import time
+import asyncio
+import datetime
+import pytz
+from googleapiclient.errors import HttpError
+
+from agenda import parse_time as parse_event_time
+from async_io import run_io
+from google_services import calendar_service
+from storage import data_path, load_json, save_json_atomic
+
+# === Einstellungen ===
+STORE_FILE = data_path("calendar_sync.json")
+SYNC_PAST_DAYS = int(os.getenv("CALENDAR_SYNC_PAST_DAYS", "30"))
+SYNC_FUTURE_DAYS = int(os.getenv("CALENDAR_SYNC_FUTURE_DAYS", "180"))
+SYNC_MIN_INTERVAL = float(os.getenv("CALENDAR_SYNC_MIN_INTERVAL", "60"))
+
+TZ = pytz.timezone("Europe/Berlin")
+
+# Zustand: Kalender in Reihenfolge der calendarList, jeweils mit syncToken und Terminen
+_state = None
+_day_index = {}
+_last_sync = 0.0
+_sync_lock = None
+
+# Wird bei jeder inhaltlichen Änderung erhöht (für abgeleitete Caches wie day_snapshot)
+version = 0
+
+
+# === Zeitangaben ===
+def _event_days(event: dict):
+    first = datetime.date.fromisoformat(event["start"][:10])
+    last = datetime.date.fromisoformat(event["end"][:10])
+    day = first
+    while day <= last:
+        yield day.isoformat()
+        day += datetime.timedelta(days=1)
+
+
+# === Index ===
+def _index_event(cal_id: str, event_id: str, event: dict):
+    for day in _event_days(event):
+        _day_index.setdefault(day, set()).add((cal_id, event_id))
+
+
+def _rebuild_index():
+    _day_index.clear()
+    for cal_id, cal in _state["calendars"].items():
+        for event_id, event in cal["events"].items():
+            _index_event(cal_id, event_id, event)
+
+
+def _load_state():
+    global _state
+    if _state is None:
+        _state = load_json(STORE_FILE, None) or {"window_day": None, "calendars": {}, "calendar_sync_token": None}
+        _rebuild_index()
+    return _state
+
+
+def _window(day: datetime.date):
+    start = TZ.localize(datetime.datetime.combine(day - datetime.timedelta(days=SYNC_PAST_DAYS), datetime.time()))
+    end = TZ.localize(datetime.datetime.combine(day + datetime.timedelta(days=SYNC_FUTURE_DAYS), datetime.time()))
+    return start, end
+
+
+def covers(start, end) -> bool:
+    """True, wenn der Zeitraum vollständig im lokal synchronisierten Fenster liegt."""
+    state = _load_state()
+    if not state["window_day"]:
+        return False
+    window_start, window_end = _window(datetime.date.fromisoformat(state["window_day"]))
+    return window_start <= start and end <= window_end
+
+
+# === Synchronisierung (blockierend, läuft im I/O-Pool) ===
+def _sync_calendar_list(sync_token):
+    service = calendar_service()
+    changes = []
+    page_token = None
+    while True:
+        params = {"pageToken": page_token, "showDeleted": True}
+        if sync_token:
+            params["syncToken"] = sync_token
+        try:
+            result = service.calendarList().list(**params).execute()
+        except HttpError as e:
+            if e.resp.status == 410 and sync_token:
+                return _sync_calendar_list(None)
+            raise
+        changes.extend(result.get("items", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return changes, result.get("nextSyncToken"), sync_token is None
+
+
+def _sync_events(cal_id: str, sync_token, window_day: datetime.date):
+    """Liefert (Änderungen, nextSyncToken, vollständig). Ohne Token oder bei 410 erfolgt ein Vollabgleich."""
+    service = calendar_service()
+    changes = []
+    page_token = None
+    full = sync_token is None
+    while True:
+        params = {"calendarId": cal_id, "singleEvents": True, "pageToken": page_token}
+        if full:
+            window_start, window_end = _window(window_day)
+            params["timeMin"] = window_start.isoformat()
+            params["timeMax"] = window_end.isoformat()
+        else:
+            params["syncToken"] = sync_token
+        try:
+            result = service.events().list(**params).execute()
+        except HttpError as e:
+            if e.resp.status == 410 and not full:
+                return _sync_events(cal_id, None, window_day)
+            raise
+        changes.extend(result.get("items", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return changes, result.get("nextSyncToken"), full
+
+
+def _removed(cal: dict) -> bool:
+    # Mit syncToken liefert calendarList auch ausgeblendete Kalender; die zeigt der Live-Pfad nicht
+    return cal.get("deleted") or cal.get("hidden")
+
+
+def _apply_calendar_list(state, changes, full: bool):
+    calendars = state["calendars"]
+    if full:
+        known = {c["id"] for c in changes if not _removed(c)}
+        for cal_id in list(calendars):
+            if cal_id not in known:
+                del calendars[cal_id]
+    for cal in changes:
+        if _removed(cal):
+            calendars.pop(cal["id"], None)
+            continue
+        entry = calendars.setdefault(cal["id"], {"sync_token": None, "events": {}})
+        entry["name"] = cal.get("summary", "(kein Name)")
+
+
+def _apply_events(cal: dict, changes, full: bool):
+    if full:
+        cal["events"] = {}
+    events = cal["events"]
+    for event in changes:
+        event_id = event["id"]
+        if event.get("status") == "cancelled":
+            events.pop(event_id, None)
+            continue
+        start = event.get("start", {}).get("dateTime") or event.get("start", {}).get("date")
+        end = event.get("end", {}).get("dateTime") or event.get("end", {}).get("date")
+        if not start or not end:
+            continue
+        events[event_id] = {
+            "summary": event.get("summary", "(kein Titel)"),
+            "start": start,
+            "end": end,
+        }
+
+
+async def sync(force: bool = False):
+    """Gleicht den lokalen Terminbestand per syncToken ab; nur Deltas gehen über das Netz."""
+    global _last_sync, _sync_lock, version
+    if _sync_lock is None:
+        _sync_lock = asyncio.Lock()
+
+    async with _sync_lock:
+        if not force and time.monotonic() - _last_sync < SYNC_MIN_INTERVAL:
+            return
+        state = _load_state()
+
+        # Täglich ein neues Fenster: Vollabgleich, damit neue Serientermine hineinwandern
+        today = datetime.datetime.now(TZ).date()
+        window_changed = state["window_day"] != today.isoformat()
+        if window_changed:
+            for cal in state["calendars"].values():
+                cal["sync_token"] = None
+
+        changes, token, full = await run_io("calendar", _sync_calendar_list, state.get("calendar_sync_token"))
+        _apply_calendar_list(state, changes, full)
+        state["calendar_sync_token"] = token
+
+        cal_ids = list(state["calendars"])
+        results = await asyncio.gather(
+            *(run_io("calendar", _sync_events, cal_id, state["calendars"][cal_id]["sync_token"], today)
+              for cal_id in cal_ids)
+        )
+
+        modified = window_changed or bool(changes)
+        dirty = modified
+        for cal_id, (event_changes, next_token, full) in zip(cal_ids, results):
+            cal = state["calendars"][cal_id]
+            _apply_events(cal, event_changes, full)
+            modified = modified or bool(event_changes)
+            dirty = dirty or modified or next_token != cal["sync_token"]
+            cal["sync_token"] = next_token
+        if modified:
+            version += 1
+
+        state["window_day"] = today.isoformat()
+        _last_sync = time.monotonic()
+        if dirty:
+            _rebuild_index()
+            await run_io("storage", save_json_atomic, STORE_FILE, state)
+
+
+# === Abfragen ===
+def lookup(start, end) -> list:
+    """Termine im Zeitraum aus dem lokalen Index, sortiert je Kalender in calendarList-Reihenfolge."""
+    state = _load_state()
+    keys = set()
+    day = (start - datetime.timedelta(days=1)).date()
+    while day <= end.date():
+        keys.update(_day_index.get(day.isoformat(), ()))
+        day += datetime.timedelta(days=1)
+
+    matches = {}
+    for cal_id, event_id in keys:
+        event = state["calendars"][cal_id]["events"][event_id]
+        event_start = parse_event_time(event["start"])
+        if event_start < end and parse_event_time(event["end"]) > start:
+            matches.setdefault(cal_id, []).append((event_start, event))
+
+    events_output = []
+    for cal_id, cal in state["calendars"].items():
+        for _, event in sorted(matches.get(cal_id, []), key=lambda m: m[0]):
+            events_output.append({
+                "summary": event["summary"],
+                "start": event["start"],
+                "end": event["end"],
+                "calendar": cal["name"]
+            })
+    return events_output
@@ -0,0 +1,104 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+
+import llm_gateway
+from async_io import run_io
+from storage import data_path, load_json, save_json_atomic
+
+# === Einstellungen ===
+CONVERSATION_DIR = data_path("conversations")
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+SUMMARY_MAX_TOKENS = 300
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", llm_gateway.DEFAULT_MODEL)
+MAX_CHATS_IN_MEMORY = 50
+MIN_RECENT_TURNS = 2
+
+# chat_id -> {"summary": str, "turns": [{"role", "content", "tokens"}], "updated": float}
+_chats = OrderedDict()
+_locks = {}
+
+
+# === Tokens ===
+def estimate_tokens(text: str) -> int:
+    """Grobe Schätzung (~4 Zeichen pro Token) plus Overhead pro Nachricht; reicht für das Budget."""
+    return len(text) // 4 + 4
+
+
+# === Persistenz ===
+def _path(chat_id) -> str:
+    return os.path.join(CONVERSATION_DIR, f"{chat_id}.json")
+
+
+def _get(chat_id) -> dict:
+    """Gespräch aus dem Speicher (LRU) bzw. von /data; selten genutzte Chats fallen aus dem Speicher."""
+    chat = _chats.get(chat_id)
+    if chat is None:
+        chat = load_json(_path(chat_id), None) or {"summary": "", "turns": [], "updated": 0.0}
+        _chats[chat_id] = chat
+        while len(_chats) > MAX_CHATS_IN_MEMORY:
+            _chats.popitem(last=False)
+    _chats.move_to_end(chat_id)
+    return chat
+
+
+def _save(chat_id, chat: dict):
+    save_json_atomic(_path(chat_id), chat)
+
+
+# === Kontext ===
+def messages_for(chat_id, question: str, system: str = None) -> list:
+    """Nachrichtenliste für eine Folgefrage: Zusammenfassung älterer Runden, letzte Runden, neue Frage."""
+    chat = _get(chat_id)
+    messages = []
+    if system:
+        messages.append({"role": "system", "content": system})
+    if chat["summary"]:
+        messages.append({"role": "system", "content": f"Bisheriger Gesprächsverlauf (Zusammenfassung):\n{chat['summary']}"})
+    messages.extend({"role": t["role"], "content": t["content"]} for t in chat["turns"])
+    messages.append({"role": "user", "content": question})
+    return messages
+
+
+async def _summarize(summary: str, turns: list) -> str:
+    transcript = "\n".join(f"{t['role']}: {t['content']}" for t in turns)
+    prompt = (
+        "Fasse den Gesprächsverlauf knapp auf Deutsch zusammen. Behalte Fakten, Namen, Zahlen "
+        "und offene Fragen, die für Folgefragen wichtig sein könnten.\n\n"
+        f"Bisherige Zusammenfassung:\n{summary or '(keine)'}\n\nNeue Runden:\n{transcript}"
+    )
+    return await llm_gateway.complete(
+        [{"role": "user", "content": prompt}], model=SUMMARY_MODEL, cache_ttl=0, max_tokens=SUMMARY_MAX_TOKENS
+    )
+
+
+async def record(chat_id, question: str, answer: str):
+    """Speichert eine Runde; was über das Token-Budget hinausgeht, wird in die Zusammenfassung gefaltet."""
+    lock = _locks.setdefault(chat_id, asyncio.Lock())
+    async with lock:
+        chat = _get(chat_id)
+        for role, content in (("user", question), ("assistant", answer)):
+            chat["turns"].append({"role": role, "content": content, "tokens": estimate_tokens(content)})
+
+        # Erst bei Überschreiten falten, dann bis auf das halbe Budget: so wird nicht jede Runde zusammengefasst
+        budget = CONTEXT_TOKEN_BUDGET - estimate_tokens(chat["summary"])
+        folded = []
+        if sum(t["tokens"] for t in chat["turns"]) > budget:
+            while len(chat["turns"]) > MIN_RECENT_TURNS and sum(t["tokens"] for t in chat["turns"]) > budget // 2:
+                folded.append(chat["turns"].pop(0))
+        if folded:
+            try:
+                chat["summary"] = await _summarize(chat["summary"], folded)
+            except Exception as e:
+                # Ohne Zusammenfassung gehen die ältesten Runden verloren, das Budget bleibt eingehalten
+                print(f"⚠️ Gesprächszusammenfassung fehlgeschlagen: {e}")
+
+        chat["updated"] = time.time()
+        await run_io("storage", _save, chat_id, chat)
+
+
+async def reset(chat_id):
+    async with _locks.setdefault(chat_id, asyncio.Lock()):
+        _chats.pop(chat_id, None)
+        await run_io("storage", _save, chat_id, {"summary": "", "turns": [], "updated": time.time()})
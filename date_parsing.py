@@ -0,0 +1,159 @@
+import re
+import datetime
+from collections import OrderedDict
+from typing import List, Tuple
+import pytz
+
+from async_io import run_io
+
+# === Einstellungen ===
+TZ = pytz.timezone("Europe/Berlin")
+CACHE_SIZE = 1024
+
+WEEKDAYS = ["montag", "dienstag", "mittwoch", "donnerstag", "freitag", "samstag", "sonntag"]
+MONTHS = {
+    "januar": 1, "jänner": 1, "februar": 2, "märz": 3, "april": 4, "mai": 5, "juni": 6,
+    "juli": 7, "august": 8, "september": 9, "oktober": 10, "november": 11, "dezember": 12,
+}
+NUMBER_WORDS = {"einem": 1, "einen": 1, "zwei": 2, "drei": 3, "vier": 4, "fünf": 5, "sechs": 6, "sieben": 7}
+
+_cache = OrderedDict()   # (normalisierter Text, heute) -> Tage
+
+
+# === Schnellpfad ===
+def _relative(days: int):
+    return lambda m, today: today + datetime.timedelta(days=days)
+
+
+def _weekday(m, today):
+    target = WEEKDAYS.index(m.group("weekday"))
+    ahead = (target - today.weekday()) % 7
+    if ahead == 0 and m.group("next"):
+        ahead = 7
+    return today + datetime.timedelta(days=ahead)
+
+
+def _numeric(m, today):
+    year = m.group("year")
+    if year is None:
+        year = today.year
+    elif len(year) == 2:
+        year = 2000 + int(year)
+    return datetime.date(int(year), int(m.group("month")), int(m.group("day")))
+
+
+def _month_name(m, today):
+    year = int(m.group("year")) if m.group("year") else today.year
+    return datetime.date(year, MONTHS[m.group("month")], int(m.group("day")))
+
+
+def _iso(m, today):
+    return datetime.date.fromisoformat(m.group(0))
+
+
+def _in_days(m, today):
+    count = m.group("count")
+    days = int(count) if count.isdigit() else NUMBER_WORDS[count]
+    if m.group("unit").startswith("woche"):
+        days *= 7
+    return today + datetime.timedelta(days=days)
+
+
+# Reihenfolge zählt: "übermorgen" vor "morgen", Zahlenformate vor Wochentagen
+PATTERNS = [(re.compile(pattern), resolve) for pattern, resolve in [
+    (r"\bübermorgen\b", _relative(2)),
+    (r"\bvorgestern\b", _relative(-2)),
+    (r"\bgestern\b", _relative(-1)),
+    (r"\b(?:heute|jetzt)\b", _relative(0)),
+    (r"\bmorgen\b", _relative(1)),
+    (r"\b\d{4}-\d{2}-\d{2}\b", _iso),
+    (r"\b(?P<day>\d{1,2})\.(?P<month>\d{1,2})\.(?P<year>\d{4}|\d{2})?(?!\d)", _numeric),
+    (r"\b(?P<day>\d{1,2})\.?\s*(?P<month>" + "|".join(MONTHS) + r")\b(?:\s+(?P<year>\d{4})\b)?", _month_name),
+    (r"\bin\s+(?P<count>\d+|" + "|".join(NUMBER_WORDS) + r")\s+(?P<unit>tagen?|wochen?)\b", _in_days),
+    (r"\b(?:(?P<next>nächsten|kommenden)\s+|(?:diesen|am)\s+)?(?P<weekday>" + "|".join(WEEKDAYS) + r")\b", _weekday),
+]]
+
+# Bleibt nach dem Schnellpfad so etwas im Text übrig, entscheidet dateparser
+DATE_HINTS = re.compile(
+    r"\d|\b(?:" + "|".join(list(MONTHS) + WEEKDAYS) +
+    r"|tag|tage|tagen|woche|wochen|wochenende|monat|monats|jahr|nächst\w*|letzt\w*|vorig\w*|uhr)\b"
+)
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def fast_parse(normalized: str, today: datetime.date) -> Tuple[List[datetime.date], bool]:
+    """Findet gängige deutsche Datumsangaben per Mustertabelle.
+
+    Liefert (Tage in Textreihenfolge, vollständig). vollständig=False heißt, dass im Rest
+    des Textes noch Datumshinweise stehen, die nur dateparser versteht.
+    """
+    found = []
+    rest = normalized
+    for pattern, resolve in PATTERNS:
+        for m in pattern.finditer(rest):
+            try:
+                found.append((m.start(), resolve(m, today)))
+            except ValueError:
+                return [], False
+        rest = pattern.sub(lambda m: " " * len(m.group(0)), rest)
+    found.sort(key=lambda item: item[0])
+    return [day for _, day in found], DATE_HINTS.search(rest) is None
+
+
+def _dateparser(text: str, today: datetime.date) -> List[datetime.date]:
+    from dateparser.search import search_dates
+    base = datetime.datetime.combine(today, datetime.time())
+    parsed = search_dates(text, languages=["de"], settings={"RELATIVE_BASE": base})
+    return [dt.date() for _, dt in parsed or []]
+
+
+# === Zugriff ===
+def _cached(text: str, today: datetime.date):
+    """(Schlüssel, gecachte Tage oder None)."""
+    key = (normalize(text), today)
+    days = _cache.get(key)
+    if days is not None:
+        _cache.move_to_end(key)
+    return key, days
+
+
+def _store(key: tuple, days) -> List[datetime.date]:
+    days = tuple(dict.fromkeys(days))
+    _cache[key] = days
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return list(days)
+
+
+def find_dates(text: str, today: datetime.date = None) -> List[datetime.date]:
+    """Alle in einer Nachricht genannten Tage (ohne Dubletten, in Textreihenfolge).
+
+    Häufige Angaben ("heute", "übermorgen", "am Freitag", "am 12.11.") erkennt die Mustertabelle;
+    nur wenn danach noch unbekannte Datumshinweise übrig sind, wird dateparser gefragt.
+    Ergebnisse werden je (normalisierter Text, heutiges Datum) gecacht.
+    """
+    if today is None:
+        today = datetime.datetime.now(TZ).date()
+    key, days = _cached(text, today)
+    if days is not None:
+        return list(days)
+    days, complete = fast_parse(key[0], today)
+    if not complete:
+        days = _dateparser(key[0], today)
+    return _store(key, days)
+
+
+async def find_dates_async(text: str, today: datetime.date = None) -> List[datetime.date]:
+    """Wie find_dates; Cache-Treffer und Schnellpfad laufen direkt, nur dateparser im I/O-Pool."""
+    if today is None:
+        today = datetime.datetime.now(TZ).date()
+    key, days = _cached(text, today)
+    if days is not None:
+        return list(days)
+    days, complete = fast_parse(key[0], today)
+    if not complete:
+        days = await run_io("date_parsing", _dateparser, key[0], today)
+    return _store(key, days)
@@ -0,0 +1,180 @@
+import os
+import time
+import asyncio
+import datetime
+import pytz
+
+import calendar_store
+import todoist_client
+from async_io import run_io
+from calendar_events import get_calendar_events
+from mail_handler import check_mail_status
+from todoist_client import get_relevant_tasks
+
+# === Einstellungen ===
+SNAPSHOT_TTL = float(os.getenv("SNAPSHOT_TTL", "600"))
+# Snapshots mit Daten aus einem früheren Stand werden früher erneut versucht
+STALE_RETRY_AFTER = 60
+TZ = pytz.timezone("Europe/Berlin")
+
+_snapshots = {}   # "YYYY-MM-DD" -> Snapshot, "YYYY-MM-DD:termine" -> Snapshot nur mit Terminen
+_locks = {}       # "YYYY-MM-DD" -> Lock
+
+
+# === Aufbau ===
+def _versions() -> tuple:
+    return calendar_store.version, todoist_client.version
+
+
+async def _load_events(start, end):
+    try:
+        return await get_calendar_events(start, end), None
+    except Exception as e:
+        return None, e
+
+
+async def _load_tasks(day):
+    try:
+        return await run_io("todoist", get_relevant_tasks, day), None
+    except Exception as e:
+        return None, e
+
+
+async def _load_mail():
+    try:
+        return await check_mail_status(), None
+    except Exception as e:
+        return None, e
+
+
+async def _no_tasks(previous: dict):
+    # Ohne Aufgaben angefordert: einen noch gültigen Stand des letzten Snapshots übernehmen
+    if previous and previous["tasks"] is not None and previous["versions"][1] == todoist_client.version:
+        return previous["tasks"], None
+    return None, None
+
+
+async def _build(day: datetime.date, include_mail: bool, previous: dict = None, include_tasks: bool = True) -> dict:
+    start = TZ.localize(datetime.datetime.combine(day, datetime.time()))
+    end = start + datetime.timedelta(days=1)
+
+    jobs = [_load_events(start, end), _load_tasks(day) if include_tasks else _no_tasks(previous)]
+    if include_mail:
+        jobs.append(_load_mail())
+    results = await asyncio.gather(*jobs)
+    (events, events_error), (tasks, tasks_error) = results[0], results[1]
+
+    # Lieber den letzten Stand zeigen als eine Zusammenfassung mit Fehlermeldung
+    stale = False
+    if events_error and previous and previous["events"] is not None:
+        print(f"⚠️ Termine nicht abrufbar, nutze letzten Snapshot: {events_error}")
+        events, events_error, stale = previous["events"], None, True
+    if tasks_error:
+        stale = True
+        if previous and previous["tasks"] is not None:
+            print(f"⚠️ Aufgaben nicht abrufbar, nutze letzten Snapshot: {tasks_error}")
+            tasks = previous["tasks"]
+        else:
+            # Die Zusammenfassung trotzdem senden, mit Hinweis statt Aufgabenliste
+            print(f"⚠️ Aufgaben nicht abrufbar: {tasks_error}")
+            tasks = [f"❌ Fehler beim Laden der Todoist-Aufgaben:\n{tasks_error}"]
+
+    grouped = {}
+    for e in events or []:
+        grouped.setdefault(e.get("calendar", "Unbekannt"), []).append(e)
+
+    snapshot = {
+        "day": day,
+        "start": start,
+        "events": events,
+        "events_error": events_error,
+        "grouped": grouped,
+        "tasks": tasks,
+        "stale": stale,
+        "mail_summary": None,
+        "open_mails": None,
+        "built_at": time.monotonic(),
+        "versions": _versions(),
+    }
+    if include_mail:
+        mail, mail_error = results[2]
+        if mail_error:
+            print(f"⚠️ Mailstatus nicht abrufbar: {mail_error}")
+            snapshot["stale"] = True
+            if previous and previous["open_mails"] is not None:
+                mail = previous["mail_summary"], previous["open_mails"]
+            else:
+                mail = "⚠️ Mailstatus derzeit nicht verfügbar.", []
+        snapshot["mail_summary"], snapshot["open_mails"] = mail
+    return snapshot
+
+
+def _is_fresh(snapshot: dict, max_age: float, include_mail: bool, include_tasks: bool = True) -> bool:
+    if snapshot["stale"]:
+        max_age = min(max_age, STALE_RETRY_AFTER)
+    if time.monotonic() - snapshot["built_at"] > max_age:
+        return False
+    if snapshot["versions"] != _versions():
+        return False
+    if include_tasks and snapshot["tasks"] is None:
+        return False
+    return not include_mail or snapshot["open_mails"] is not None
+
+
+# === Zugriff ===
+async def get_day_snapshot(day: datetime.date, include_mail: bool = False, max_age: float = SNAPSHOT_TTL,
+                           include_tasks: bool = True) -> dict:
+    """Tagesbild (Termine je Kalender, Aufgaben, optional Mailstatus), einmal gebaut und von allen genutzt.
+
+    Ein Snapshot wird neu gebaut, wenn er älter als max_age ist oder sich Kalender- bzw.
+    Todoist-Bestand seitdem geändert haben. Gleichzeitige Anfragen warten auf denselben Aufbau.
+    include_tasks=False spart den Todoist-Abruf (z. B. für /kalender); "tasks" ist dann None,
+    sofern kein gültiger Stand übernommen werden konnte.
+    """
+    _prune()
+    key = day.isoformat()
+    lock = _locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        snapshot = _snapshots.get(key)
+        if snapshot is not None and _is_fresh(snapshot, max_age, include_mail, include_tasks):
+            return snapshot
+        if not include_tasks:
+            # Teil-Snapshots (z. B. /kalender) getrennt ablegen, damit sie einen vorbereiteten
+            # vollständigen Snapshot nicht ersetzen
+            partial_key = f"{key}:termine"
+            partial = _snapshots.get(partial_key)
+            if partial is not None and _is_fresh(partial, max_age, include_mail, include_tasks):
+                return partial
+            partial = await _build(day, include_mail, previous=partial or snapshot, include_tasks=False)
+            _snapshots[partial_key] = partial
+            return partial
+        snapshot = await _build(day, include_mail, previous=snapshot, include_tasks=include_tasks)
+        _snapshots[key] = snapshot
+        return snapshot
+
+
+def _prune():
+    # Snapshots und Locks vergangener Tage verwerfen, damit der Bestand nicht endlos wächst
+    oldest = (datetime.datetime.now(TZ).date() - datetime.timedelta(days=1)).isoformat()
+    for key in [k for k in _snapshots if k[:10] < oldest]:
+        del _snapshots[key]
+    for key in [k for k, lock in _locks.items() if k < oldest and not lock.locked()]:
+        del _locks[key]
+
+
+async def prewarm(day_offset: int = 0, include_mail: bool = True):
+    """Baut den Snapshot kurz vor einer geplanten Zusammenfassung neu auf."""
+    day = datetime.datetime.now(TZ).date() + datetime.timedelta(days=day_offset)
+    try:
+        await get_day_snapshot(day, include_mail=include_mail, max_age=0)
+        print(f"🔥 Tages-Snapshot für {day.isoformat()} vorbereitet.")
+    except Exception as e:
+        print(f"⚠️ Snapshot-Vorbereitung fehlgeschlagen: {e}")
+
+
+def invalidate(day: datetime.date = None):
+    if day is None:
+        _snapshots.clear()
+    else:
+        _snapshots.pop(day.isoformat(), None)
+        _snapshots.pop(f"{day.isoformat()}:termine", None)
@@ -0,0 +1,75 @@
+import uuid
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from storage import data_path
+
+# === Einstellungen ===
+DB_FILE = data_path("scheduler.db")
+
+# Ein Versand dieses Prozesses, der so lange "läuft", gilt als abgebrochen (z. B. hängender Aufruf)
+STALE_CLAIM = timedelta(minutes=10)
+KEEP_DAYS = 30
+
+# Kennung dieses Prozesslaufs; "sending"-Einträge eines früheren Laufs sind nach einem Absturz verwaist
+BOOT_ID = uuid.uuid4().hex
+
+_lock = threading.Lock()
+_conn = None
+
+
+# === Datenbank ===
+def _connect():
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS deliveries ("
+                         "slot TEXT PRIMARY KEY, status TEXT NOT NULL, updated_at TEXT NOT NULL, boot TEXT)")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(deliveries)")}
+            if "boot" not in columns:
+                conn.execute("ALTER TABLE deliveries ADD COLUMN boot TEXT")
+        _conn = conn
+    return _conn
+
+
+# === Versand genau einmal pro Slot ===
+def claim(slot: str) -> str:
+    """Reserviert einen Slot (z. B. "morning:2025-05-10:06:30").
+
+    Liefert "claimed", wenn dieser Lauf senden soll, "sent", wenn der Slot schon versendet ist,
+    oder "sending", wenn dieser Prozess ihn gerade versendet. Unfertige Versände eines früheren
+    Prozesslaufs (Absturz mitten im Senden) gelten als freigegeben und werden nachgeholt.
+    """
+    now = datetime.now()
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute("DELETE FROM deliveries WHERE updated_at < ?", ((now - timedelta(days=KEEP_DAYS)).isoformat(),))
+            conn.execute("DELETE FROM deliveries WHERE slot = ? AND status = 'sending' "
+                         "AND (boot IS NULL OR boot != ? OR updated_at < ?)",
+                         (slot, BOOT_ID, (now - STALE_CLAIM).isoformat()))
+            cursor = conn.execute("INSERT OR IGNORE INTO deliveries (slot, status, updated_at, boot) "
+                                  "VALUES (?, 'sending', ?, ?)", (slot, now.isoformat(), BOOT_ID))
+            if cursor.rowcount == 1:
+                return "claimed"
+            row = conn.execute("SELECT status FROM deliveries WHERE slot = ?", (slot,)).fetchone()
+    return row[0] if row else "sending"
+
+
+def confirm(slot: str):
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute("UPDATE deliveries SET status = 'sent', updated_at = ? WHERE slot = ?",
+                         (datetime.now().isoformat(), slot))
+
+
+def release(slot: str):
+    """Gibt einen Slot nach fehlgeschlagenem Versand wieder frei, damit ein Nachholen möglich ist."""
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute("DELETE FROM deliveries WHERE slot = ? AND status = 'sending'", (slot,))
@@ -1,6 +1,7 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import ContextTypes
-from email_tracker import check_emails_for_response, archive_email, defer_email
+from email_tracker import scan_for_response, archive_email, defer_email
+from async_io import run_io
 
 # === Nachrichtenvorlage ===
 def format_email_message(email):
@@ -22,7 +23,7 @@ def generate_buttons(email_id):
 
 # === /mail-Befehl ===
 async def mail_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    emails = check_emails_for_response()
+    emails = await scan_for_response()
     if not emails:
         await update.message.reply_text("Du hast derzeit keine unbeantworteten Mails.")
         return
@@ -40,11 +41,11 @@ async def mail_callback_handler(update: Update, context: ContextTypes.DEFAULT_TY
     action, msg_id = query.data.split(":", 1)
 
     if action == "archive":
-        archive_email(msg_id)
+        await run_io("gmail", archive_email, msg_id)
         await query.edit_message_reply_markup(reply_markup=None)
         await query.edit_message_text("✅ Archiviert.")
 
     elif action == "defer":
-        defer_email(msg_id)
+        await run_io("storage", defer_email, msg_id)
         await query.edit_message_reply_markup(reply_markup=None)
         await query.edit_message_text("⏰ Erinnerung um 6 Stunden verschoben.")
@@ -0,0 +1,91 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Set, Tuple
+
+from storage import data_path
+
+# === Einstellungen ===
+DB_FILE = data_path("email_state.db")
+
+# Frühere JSON-Dateien, werden beim ersten Öffnen übernommen
+LEGACY_ARCHIVE_FILE = "archived_emails.json"
+LEGACY_DEFER_FILE = "deferred_emails.json"
+
+_lock = threading.Lock()
+_conn = None
+
+
+# === Datenbank ===
+def _migrate_legacy(conn):
+    if os.path.exists(LEGACY_ARCHIVE_FILE):
+        with open(LEGACY_ARCHIVE_FILE, "r") as f:
+            archived = json.load(f)
+        conn.executemany("INSERT OR IGNORE INTO archived (id, archived_at) VALUES (?, ?)",
+                         [(msg_id, datetime.now().isoformat()) for msg_id in archived])
+        os.replace(LEGACY_ARCHIVE_FILE, LEGACY_ARCHIVE_FILE + ".migrated")
+    if os.path.exists(LEGACY_DEFER_FILE):
+        with open(LEGACY_DEFER_FILE, "r") as f:
+            deferred = json.load(f)
+        conn.executemany(
+            "INSERT INTO deferred (id, defer_until) VALUES (?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET defer_until = MAX(defer_until, excluded.defer_until)",
+            [(entry["id"], entry["defer_until"]) for entry in deferred])
+        os.replace(LEGACY_DEFER_FILE, LEGACY_DEFER_FILE + ".migrated")
+
+
+def _connect():
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS archived (id TEXT PRIMARY KEY, archived_at TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS deferred (id TEXT PRIMARY KEY, defer_until TEXT NOT NULL)")
+            _migrate_legacy(conn)
+        _conn = conn
+    return _conn
+
+
+# === Abfragen ===
+def load_snapshot() -> Tuple[Set[str], Dict[str, datetime]]:
+    """Archivierte IDs und aktive Zurückstellungen für einen Prüflauf; abgelaufene werden gelöscht."""
+    now = datetime.now().isoformat()
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute("DELETE FROM deferred WHERE defer_until <= ?", (now,))
+        archived = {row[0] for row in conn.execute("SELECT id FROM archived")}
+        deferred = {row[0]: datetime.fromisoformat(row[1]) for row in conn.execute("SELECT id, defer_until FROM deferred")}
+    return archived, deferred
+
+
+def is_archived(msg_id: str) -> bool:
+    with _lock:
+        return _connect().execute("SELECT 1 FROM archived WHERE id = ?", (msg_id,)).fetchone() is not None
+
+
+def is_deferred(msg_id: str) -> bool:
+    with _lock:
+        row = _connect().execute("SELECT defer_until FROM deferred WHERE id = ?", (msg_id,)).fetchone()
+    return row is not None and datetime.now() < datetime.fromisoformat(row[0])
+
+
+# === Änderungen ===
+def mark_archived(msg_id: str):
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO archived (id, archived_at) VALUES (?, ?)",
+                         (msg_id, datetime.now().isoformat()))
+
+
+def defer(msg_id: str, until: datetime):
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute("INSERT INTO deferred (id, defer_until) VALUES (?, ?) "
+                         "ON CONFLICT(id) DO UPDATE SET defer_until = excluded.defer_until",
+                         (msg_id, until.isoformat()))
@@ -1,158 +1,195 @@
-import os
-import json
 import base64
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
+import email_state
+import mail_classifier
+import mail_state
+import single_flight
+from google_services import gmail_service, execute_batch
+from storage import data_path, load_json, save_json_atomic
 from datetime import datetime, timedelta
 from email.utils import parsedate_to_datetime
 
 # === Einstellungen ===
 LABEL_FILTER = "label:Allgemein in:inbox newer_than:30d"
-ARCHIVE_FILE = "archived_emails.json"
-DEFER_FILE = "deferred_emails.json"
-IGNORED_SENDERS = [
-    "noreply@", "newsletter@", "no-reply@", "automail@", "support@",
-    "notifications@", "info@", "donotreply@", "google.com", "facebook.com", "zoom.us"
-]
-KEYWORDS_EXPECTING_ANSWER = [
-    # Deutsch
-    "kannst du", "könntest du", "würdest du", "wäre gut", "bitte", "brauch",
-    "brauchst du", "schickst du", "gib mir", "meld dich", "lass uns wissen",
-    "teile mir mit", "wollen wir", "sollen wir", "soll ich", "hättest du",
-    "ist das möglich", "klären wir", "passt dir", "wann passt", "wie sieht es aus",
-    "was meinst du", "geht das", "wir bräuchten", "ich würde dich bitten",
-    "wäre das möglich", "bitte um info", "rückmeldung", "deine meinung",
-    # Englisch
-    "can you", "could you", "would you", "should we", "let me know",
-    "please", "i need", "would be great", "i’d like", "send me", "is it possible",
-    "get back to me", "respond", "follow up", "any update", "what do you think",
-    "are you available", "do you have time", "your input", "your opinion",
-    "i’d appreciate", "we need", "looking forward to your reply", "i hope to hear"
-]
+VERDICT_CACHE_FILE = data_path("email_verdicts.json")
+MESSAGE_FIELDS = "id,threadId,snippet,payload(headers(name,value),parts(mimeType,body/data))"
+THREAD_FIELDS = "messages(id,labelIds)"
 
 # === Hilfsfunktionen ===
-def load_json_file(path):
-    if os.path.exists(path):
-        with open(path, "r") as f:
-            return json.load(f)
-    return []
-
-def save_json_file(path, data):
-    with open(path, "w") as f:
-        json.dump(data, f)
-
 def get_gmail_service():
-    creds = Credentials.from_authorized_user_file("token.json", [
-        'https://www.googleapis.com/auth/gmail.modify'])
-    return build('gmail', 'v1', credentials=creds)
+    return gmail_service()
 
 def extract_text(payload):
     if 'parts' in payload:
         for part in payload['parts']:
             if part['mimeType'] == 'text/plain':
-                data = part['body'].get('data')
+                # Teile mit attachmentId kommen durch die Feldmaske ohne 'body'
+                data = part.get('body', {}).get('data')
                 if data:
                     return base64.urlsafe_b64decode(data).decode("utf-8")
     return ""
 
 def message_needs_reply(sender, snippet, body):
     sender = sender.lower()
-    if any(x in sender for x in IGNORED_SENDERS):
+    if mail_classifier.is_ignored_sender(sender):
         return False
     if '?' in snippet or '?' in body:
         return True
     body_lower = body.lower()
-    return any(keyword in body_lower for keyword in KEYWORDS_EXPECTING_ANSWER)
+    return mail_classifier.expects_answer(body_lower)
 
 def is_deferred(msg_id):
-    deferred = load_json_file(DEFER_FILE)
-    for entry in deferred:
-        if entry['id'] == msg_id:
-            if datetime.now() < datetime.fromisoformat(entry['defer_until']):
-                return True
-    return False
+    return email_state.is_deferred(msg_id)
+
+def message_request(service, msg_id):
+    # Header plus die Inline-Daten aller Teile der obersten Ebene (auch text/html, das meist größer ist);
+    # Gmail kann Teile nicht nach mimeType filtern und Inline-Teile nicht einzeln liefern.
+    # Anhänge (nur attachmentId) und verschachtelte Teile werden nicht übertragen.
+    return service.users().messages().get(userId='me', id=msg_id, format='full', fields=MESSAGE_FIELDS)
+
+def thread_request(service, thread_id):
+    return service.users().threads().get(userId='me', id=thread_id, format='minimal', fields=THREAD_FIELDS)
+
+def evaluate_incoming(msg_data):
+    headers = {h['name']: h['value'] for h in msg_data['payload']['headers']}
+    sender = headers.get('From', '')
+    subject = headers.get('Subject', '(kein Betreff)')
+    date = headers.get('Date', '')
+    snippet = msg_data.get('snippet', '')
+    body = extract_text(msg_data['payload'])
+
+    if message_needs_reply(sender, snippet, body):
+        thread_id = msg_data.get('threadId')
+        gmail_link = f"https://mail.google.com/mail/u/0/#inbox/{thread_id}"
+        return {
+            'id': msg_data['id'],
+            'from': sender,
+            'subject': subject,
+            'date': date,
+            'link': gmail_link
+        }
+    return None
+
+def evaluate_sent(sent_data, messages_in_thread):
+    msg_id = sent_data['id']
+    headers = {h['name']: h['value'] for h in sent_data['payload']['headers']}
+    subject = headers.get('Subject', '(kein Betreff)')
+    date = headers.get('Date', '')
+    snippet = sent_data.get('snippet', '')
+    body = extract_text(sent_data['payload'])
+    thread_id = sent_data.get('threadId')
+
+    after_sent = [m for m in messages_in_thread if m['id'] != msg_id and m.get('labelIds') and 'SENT' not in m['labelIds']]
+
+    if not after_sent and message_needs_reply("", snippet, body):
+        gmail_link = f"https://mail.google.com/mail/u/0/#inbox/{thread_id}"
+        return {
+            'id': msg_id,
+            'from': '(Du selbst)',
+            'subject': subject,
+            'date': date,
+            'link': gmail_link
+        }
+    return None
+
+def fetch_batch(service, message_ids, thread_ids):
+    """Lädt Nachrichten und Threads gemeinsam per Gmail-Batch; Fehlschläge werden ausgelassen.
+
+    Getrennte Rückgabe, weil die ID eines Threads der ID seiner ersten Nachricht entspricht.
+    """
+    keys = [("message", msg_id) for msg_id in message_ids] + [("thread", thread_id) for thread_id in thread_ids]
+    requests = [
+        message_request(service, key) if kind == "message" else thread_request(service, key)
+        for kind, key in keys
+    ]
+
+    fetched = {"message": {}, "thread": {}}
+    for (kind, key), result in zip(keys, execute_batch(service, requests)):
+        if isinstance(result, Exception):
+            print(f"⚠️ Fehler beim Laden von {kind} {key}: {result}")
+            continue
+        fetched[kind][key] = result
+    return fetched["message"], fetched["thread"]
 
 def check_emails_for_response():
-    archived = load_json_file(ARCHIVE_FILE)
+    # Archiv- und Zurückstellungsstand einmal pro Lauf laden
+    archived, deferred = email_state.load_snapshot()
     service = get_gmail_service()
-    results = service.users().messages().list(userId='me', q=LABEL_FILTER, maxResults=30).execute()
-    messages = results.get('messages', [])
-    reply_needed = []
 
+    # Bewertungen aus dem letzten Lauf: eingehende Nachrichten ändern sich nie,
+    # gesendete nur, wenn sich ihr Thread laut History API geändert hat
+    changed, cursor = mail_state.changed_thread_ids("tracker")
+    cache = load_json(VERDICT_CACHE_FILE, None) or {"incoming": {}, "sent": {}}
+    new_cache = {"incoming": {}, "sent": {}}
+
+    # Eingang und gesendete Mails (Ergänzung) in einem Roundtrip auflisten
+    results, sent_results = execute_batch(service, [
+        service.users().messages().list(userId='me', q=LABEL_FILTER, maxResults=30),
+        service.users().messages().list(userId='me', q="label:sent label:Allgemein older_than:2d", maxResults=20),
+    ])
+    for result in (results, sent_results):
+        if isinstance(result, Exception):
+            raise result
+    messages = [m for m in results.get('messages', []) if m['id'] not in archived and m['id'] not in deferred]
+    sent_messages = [m for m in sent_results.get('messages', []) if m['id'] not in archived and m['id'] not in deferred]
+
+    # Alles, was nicht aus dem Cache kommt, in einem Batch laden; jeder Thread nur einmal
+    incoming_to_fetch = [m['id'] for m in messages if m['id'] not in cache["incoming"]]
+    sent_to_fetch = [
+        m for m in sent_messages
+        if not (m['id'] in cache["sent"] and changed is not None and m['threadId'] not in changed)
+    ]
+    fetched, threads = fetch_batch(
+        service,
+        incoming_to_fetch + [m['id'] for m in sent_to_fetch],
+        dict.fromkeys(m['threadId'] for m in sent_to_fetch),
+    )
+    to_fetch = set(incoming_to_fetch) | {m['id'] for m in sent_to_fetch}
+
+    reply_needed = []
     for msg in messages:
         msg_id = msg['id']
-        if msg_id in archived or is_deferred(msg_id):
+        if msg_id not in to_fetch:
+            entry = cache["incoming"][msg_id]
+        elif msg_id in fetched:
+            entry = evaluate_incoming(fetched[msg_id])
+        else:
             continue
-
-        msg_data = service.users().messages().get(userId='me', id=msg_id, format='full').execute()
-        headers = {h['name']: h['value'] for h in msg_data['payload']['headers']}
-        sender = headers.get('From', '')
-        subject = headers.get('Subject', '(kein Betreff)')
-        date = headers.get('Date', '')
-        snippet = msg_data.get('snippet', '')
-        body = extract_text(msg_data['payload'])
-
-        if message_needs_reply(sender, snippet, body):
-            thread_id = msg_data.get('threadId')
-            gmail_link = f"https://mail.google.com/mail/u/0/#inbox/{thread_id}"
-            reply_needed.append({
-                'id': msg_id,
-                'from': sender,
-                'subject': subject,
-                'date': date,
-                'link': gmail_link
-            })
-
-    # Ergänzung: gesendete Mails prüfen
-    sent_results = service.users().messages().list(userId='me', q="label:sent label:Allgemein older_than:2d", maxResults=20).execute()
-    sent_messages = sent_results.get('messages', [])
+        new_cache["incoming"][msg_id] = entry
+        if entry:
+            reply_needed.append(entry)
 
     for sent in sent_messages:
         msg_id = sent['id']
-        if msg_id in archived or is_deferred(msg_id):
+        if msg_id not in to_fetch:
+            entry = cache["sent"][msg_id]["entry"]
+        elif msg_id in fetched and sent['threadId'] in threads:
+            entry = evaluate_sent(fetched[msg_id], threads[sent['threadId']].get('messages', []))
+        else:
             continue
+        new_cache["sent"][msg_id] = {"thread_id": sent['threadId'], "entry": entry}
+        if entry:
+            reply_needed.append(entry)
 
-        sent_data = service.users().messages().get(userId='me', id=msg_id, format='full').execute()
-        headers = {h['name']: h['value'] for h in sent_data['payload']['headers']}
-        subject = headers.get('Subject', '(kein Betreff)')
-        date = headers.get('Date', '')
-        snippet = sent_data.get('snippet', '')
-        body = extract_text(sent_data['payload'])
-        thread_id = sent_data.get('threadId')
-
-        thread = service.users().threads().get(userId='me', id=thread_id, format='metadata').execute()
-        messages_in_thread = thread.get('messages', [])
-        after_sent = [m for m in messages_in_thread if m['id'] != msg_id and m['labelIds'] and 'SENT' not in m['labelIds']]
-
-        if not after_sent and message_needs_reply("", snippet, body):
-            gmail_link = f"https://mail.google.com/mail/u/0/#inbox/{thread_id}"
-            reply_needed.append({
-                'id': msg_id,
-                'from': '(Du selbst)',
-                'subject': subject,
-                'date': date,
-                'link': gmail_link
-            })
-
+    save_json_atomic(VERDICT_CACHE_FILE, new_cache)
+    mail_state.commit_cursor("tracker", cursor)
     return reply_needed
 
+async def scan_for_response() -> list:
+    """check_emails_for_response im Threadpool; gleichzeitige /mail-Aufrufe teilen sich einen Lauf."""
+    return await single_flight.shared_io("gmail", "tracker_scan", check_emails_for_response)
+
 def archive_email(message_id):
-    archived = load_json_file(ARCHIVE_FILE)
-    if message_id not in archived:
+    if not email_state.is_archived(message_id):
         service = get_gmail_service()
         service.users().messages().modify(
             userId='me',
             id=message_id,
             body={'removeLabelIds': ['INBOX']}
         ).execute()
-        archived.append(message_id)
-        save_json_file(ARCHIVE_FILE, archived)
+        email_state.mark_archived(message_id)
         return True
     return False
 
 def defer_email(message_id):
-    deferred = load_json_file(DEFER_FILE)
-    defer_until = (datetime.now() + timedelta(hours=6)).isoformat()
-    deferred.append({"id": message_id, "defer_until": defer_until})
-    save_json_file(DEFER_FILE, deferred)
+    email_state.defer(message_id, datetime.now() + timedelta(hours=6))
     return True
@@ -0,0 +1,171 @@
+import os
+import time
+import base64
+import pickle
+import functools
+import threading
+from urllib.parse import urlsplit
+
+import tracing
+import http_session
+import outbound_policy
+from async_io import HTTP_TIMEOUT
+
+# Die Google-Bibliotheken werden erst beim ersten Zugriff importiert, damit der Bot schneller startet
+
+# === Einstellungen ===
+TOKEN_PKL_PATH = "token.pkl"
+TOKEN_JSON_PATH = "token.json"
+TOKEN_JSON_SCOPES = ["https://www.googleapis.com/auth/gmail.modify"]
+
+_lock = threading.Lock()
+_local = threading.local()
+_creds = None
+_services = {}
+_request_class = None
+
+
+# === Credentials ===
+def _load_credentials():
+    encoded = os.getenv("TOKEN_PKL_BASE64")
+    if not os.path.exists(TOKEN_PKL_PATH) and encoded:
+        with open(TOKEN_PKL_PATH, "wb") as f:
+            f.write(base64.b64decode(encoded))
+        print("✅ token.pkl aus Umgebungsvariable erzeugt.")
+
+    if os.path.exists(TOKEN_PKL_PATH):
+        with open(TOKEN_PKL_PATH, "rb") as token:
+            return pickle.load(token)
+    if os.path.exists(TOKEN_JSON_PATH):
+        from google.oauth2.credentials import Credentials
+        return Credentials.from_authorized_user_file(TOKEN_JSON_PATH, TOKEN_JSON_SCOPES)
+    raise RuntimeError("Keine Google-Credentials gefunden (token.pkl, TOKEN_PKL_BASE64 oder token.json)")
+
+
+def get_credentials():
+    """Lädt die Google-Credentials einmalig und erneuert das Token bei Ablauf."""
+    global _creds
+    with _lock:
+        if _creds is None:
+            _creds = _load_credentials()
+        if not _creds.valid and _creds.refresh_token:
+            from google.auth.transport.requests import Request
+            _creds.refresh(Request())
+        return _creds
+
+
+# === Discovery-Services ===
+def _thread_http():
+    # httplib2 ist nicht threadsafe: jeder I/O-Thread bekommt eine eigene Verbindung
+    http = getattr(_local, "http", None)
+    if http is None:
+        import httplib2
+        import google_auth_httplib2
+        http = google_auth_httplib2.AuthorizedHttp(get_credentials(), http=_counting_http(httplib2.Http(timeout=HTTP_TIMEOUT)))
+        _local.http = http
+    return http
+
+
+def _counting_http(http):
+    """Meldet jede Anfrage an http_session, je nachdem ob httplib2 eine offene Verbindung wiederverwendet."""
+    send = http.request
+
+    def request(uri, *args, **kwargs):
+        parts = urlsplit(uri)
+        http_session.record(parts.hostname, f"{parts.scheme}:{parts.netloc}" in http.connections)
+        return send(uri, *args, **kwargs)
+
+    http.request = request
+    return http
+
+
+def _policy_request_class():
+    global _request_class
+    if _request_class is None:
+        from googleapiclient.http import HttpRequest
+
+        class PolicyRequest(HttpRequest):
+            """HttpRequest, dessen execute() über outbound_policy läuft (Token und Wiederholungen je Anfrage)."""
+            policy_service = None
+
+            def execute(self, http=None, num_retries=0):
+                # Jeder Versuch wird einzeln gemessen; methodId ist z. B. "gmail.users.threads.get"
+                name = self.methodId or f"{self.policy_service}.request"
+                return outbound_policy.call(self.policy_service, tracing.timed, "io", name, super().execute,
+                                            http=http, num_retries=num_retries)
+
+        _request_class = PolicyRequest
+    return _request_class
+
+
+def _build_request(service_name, http, *args, **kwargs):
+    request = _policy_request_class()(_thread_http(), *args, **kwargs)
+    request.policy_service = service_name
+    return request
+
+
+def get_service(name: str, version: str):
+    """Gibt den gemeinsam genutzten Discovery-Service zurück (statisches Discovery-Dokument, kein Fetch)."""
+    key = (name, version)
+    service = _services.get(key)
+    if service is None:
+        creds = get_credentials()
+        with _lock:
+            service = _services.get(key)
+            if service is None:
+                from googleapiclient.discovery import build
+                service = build(
+                    name,
+                    version,
+                    credentials=creds,
+                    requestBuilder=functools.partial(_build_request, name),
+                    static_discovery=True,
+                    cache_discovery=False,
+                )
+                _services[key] = service
+    return service
+
+
+# === Batch-Requests ===
+def execute_batch(service, requests: list, batch_size: int = 100) -> list:
+    """Führt Requests als HTTP-Batch aus (max. batch_size je Roundtrip).
+
+    Liefert die Antworten in Eingabereihenfolge; fehlgeschlagene Einzelrequests
+    stehen als Exception an ihrer Position. Einzelrequests mit vorübergehendem Fehler
+    (z. B. 429 innerhalb des Batches) werden nach Backoff in einem neuen Batch wiederholt.
+    """
+    results = [None] * len(requests)
+    policy = getattr(requests[0], "policy_service", None) if requests else None
+    max_retries = outbound_policy.POLICIES[policy][2] if policy in outbound_policy.POLICIES else 0
+
+    def store(request_id, response, exception):
+        results[int(request_id)] = exception if exception is not None else response
+
+    pending = list(range(len(requests)))
+    attempt = 0
+    while pending:
+        for offset in range(0, len(pending), batch_size):
+            batch = service.new_batch_http_request(callback=store)
+            for i in pending[offset:offset + batch_size]:
+                batch.add(requests[i], request_id=str(i))
+            outbound_policy.call(policy, tracing.timed, "io", f"{policy}.batch", batch.execute)
+
+        retry = [i for i in pending if isinstance(results[i], Exception) and outbound_policy.is_retryable(results[i])]
+        if not retry or attempt >= max_retries:
+            break
+        wait = max(outbound_policy.backoff(attempt, results[i]) for i in retry)
+        if not outbound_policy.deadline_left(wait):
+            break
+        print(f"🔁 {policy}: {len(retry)} Batch-Anfragen fehlgeschlagen, neuer Versuch in {wait:.1f}s")
+        time.sleep(wait)
+        pending = retry
+        attempt += 1
+    return results
+
+
+def calendar_service():
+    return get_service("calendar", "v3")
+
+
+def gmail_service():
+    return get_service("gmail", "v1")
@@ -0,0 +1,115 @@
+import threading
+from collections import Counter
+from urllib.parse import urlsplit
+
+import tracing
+import outbound_policy
+from async_io import IO_MAX_WORKERS
+
+# === Einstellungen ===
+POOL_HOSTS = 10                 # so viele Hosts behält der Pool gleichzeitig
+POOL_MAXSIZE = IO_MAX_WORKERS   # Keep-Alive-Verbindungen je Host (eine je I/O-Thread)
+
+# Host -> Dienst in outbound_policy.POLICIES (Rate-Limit, Wiederholungen je Anfrage)
+HOST_SERVICES = {
+    "api.todoist.com": "todoist",
+    "api.coingecko.com": "coingecko",
+}
+
+_lock = threading.Lock()
+_local = threading.local()
+_adapter = None
+
+# Host -> Zähler für Verbindungen außerhalb von requests (z. B. httplib2 der Google-Clients)
+_external = {}
+
+
+# === Gemeinsamer Verbindungspool ===
+def _shared_adapter():
+    global _adapter
+    with _lock:
+        if _adapter is None:
+            from requests.adapters import HTTPAdapter
+            # Wiederholungen übernimmt outbound_policy
+            _adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+        return _adapter
+
+
+def _send(send, method, url, *args, **kwargs):
+    parts = urlsplit(url)
+    name = f"{HOST_SERVICES.get(parts.hostname, parts.hostname)}.{method.upper()} {parts.path}"
+    with tracing.span("io", name):
+        response = send(method, url, *args, **kwargs)
+    # Vorübergehende Fehler als Exception melden, damit outbound_policy wiederholen kann
+    if response.status_code in outbound_policy.RETRY_STATUS:
+        response.raise_for_status()
+    return response
+
+
+def session():
+    """requests-Session des aktuellen Threads; alle Sessions teilen sich einen Keep-Alive-Pool.
+
+    Der urllib3-Pool ist threadsicher, Session-Zustand (Cookies, Header) nicht; deshalb eine
+    Session pro Thread über demselben Adapter. Jede Anfrage an einen Host aus HOST_SERVICES
+    läuft einzeln über outbound_policy.
+    """
+    current = getattr(_local, "session", None)
+    if current is None:
+        import requests
+
+        class PolicySession(requests.Session):
+            def request(self, method, url, *args, **kwargs):
+                service = HOST_SERVICES.get(urlsplit(url).hostname)
+                send = super().request
+                return outbound_policy.call(service, _send, send, method, url, *args, **kwargs)
+
+        current = PolicySession()
+        adapter = _shared_adapter()
+        current.mount("https://", adapter)
+        current.mount("http://", adapter)
+        _local.session = current
+    return current
+
+
+# === Metriken ===
+def record(host: str, reused: bool):
+    """Zählt eine Anfrage eines anderen HTTP-Clients (neue vs. wiederverwendete Verbindung)."""
+    with _lock:
+        counter = _external.setdefault(host, Counter())
+        counter["requests"] += 1
+        if not reused:
+            counter["connections"] += 1
+
+
+def stats() -> dict:
+    """Host -> {"requests", "connections", "reuse"} über requests- und externe Verbindungen."""
+    result = {}
+    if _adapter is not None:
+        pools = _adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None or not pool.num_requests:
+                continue
+            entry = result.setdefault(pool.host, Counter())
+            entry["requests"] += pool.num_requests
+            entry["connections"] += pool.num_connections
+    with _lock:
+        for host, counter in _external.items():
+            entry = result.setdefault(host, Counter())
+            entry.update(counter)
+    return {
+        host: {
+            "requests": entry["requests"],
+            "connections": entry["connections"],
+            "reuse": 1 - entry["connections"] / entry["requests"] if entry["requests"] else 0.0,
+        }
+        for host, entry in result.items()
+    }
+
+
+def summary() -> str:
+    lines = [
+        f"{host}: {s['requests']} Anfragen über {s['connections']} Verbindungen ({s['reuse']:.0%} wiederverwendet)"
+        for host, s in sorted(stats().items())
+    ]
+    return "\n".join(lines) or "Noch keine HTTP-Anfragen."
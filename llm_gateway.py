@@ -0,0 +1,240 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+
+import tracing
+import outbound_policy
+
+# === Einstellungen ===
+DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "1800"))
+CACHE_MAX_ENTRIES = 256
+# Wie alt eine Antwort höchstens sein darf, um bei einem Ausfall noch als Notfallantwort zu dienen
+STALE_MAX_AGE = float(os.getenv("LLM_STALE_MAX_AGE", str(6 * 3600)))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+
+_cache = OrderedDict()   # Prompt-Hash -> (erzeugt, gültig bis, Antwort)
+_inflight = {}           # Prompt-Hash -> laufender Aufruf
+_backend = None
+
+# Modell -> Zähler für Aufrufe, Cache-Treffer, Tokens und Latenz
+stats = {}
+
+
+# === Backends ===
+class OpenAIBackend:
+    """Echte Aufrufe über AsyncOpenAI; der Client wird erst beim ersten Aufruf erzeugt."""
+
+    def __init__(self, api_key: str = None):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.client = None
+
+    def _client(self):
+        if self.client is None:
+            from openai import AsyncOpenAI
+            # Wiederholungen übernimmt outbound_policy, sonst würde doppelt wiederholt
+            self.client = AsyncOpenAI(api_key=self.api_key, timeout=OPENAI_TIMEOUT, max_retries=0)
+        return self.client
+
+    async def complete(self, model: str, messages: list, **params):
+        response = await self._client().chat.completions.create(model=model, messages=messages, **params)
+        if not response.choices or not response.choices[0].message:
+            raise RuntimeError("Keine Antwort von GPT erhalten.")
+        usage = response.usage
+        tokens = (usage.prompt_tokens, usage.completion_tokens) if usage else (0, 0)
+        return (response.choices[0].message.content or "").strip(), tokens
+
+    async def stream(self, model: str, messages: list, usage: list, **params):
+        """Liefert Textstücke, sobald sie ankommen; die Token-Zahlen landen am Ende in `usage`."""
+        response = await self._client().chat.completions.create(
+            model=model, messages=messages, stream=True, stream_options={"include_usage": True}, **params
+        )
+        async for chunk in response:
+            if chunk.usage:
+                usage[:] = [chunk.usage.prompt_tokens, chunk.usage.completion_tokens]
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class FakeBackend:
+    """Lokales Backend ohne Netz (LLM_BACKEND=fake): feste Antworten, merkt sich alle Aufrufe."""
+
+    def __init__(self, reply: str = "Keine relevanten Updates.", delay: float = 0.0):
+        self.reply = reply
+        self.delay = delay
+        self.calls = []
+
+    async def complete(self, model: str, messages: list, **params):
+        self.calls.append((model, messages, params))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        prompt_tokens = sum(len(m.get("content", "").split()) for m in messages)
+        return self.reply, (prompt_tokens, len(self.reply.split()))
+
+    async def stream(self, model: str, messages: list, usage: list, **params):
+        self.calls.append((model, messages, params))
+        words = self.reply.split(" ")
+        for i, word in enumerate(words):
+            if self.delay:
+                await asyncio.sleep(self.delay / len(words))
+            yield word if i == 0 else " " + word
+        usage[:] = [sum(len(m.get("content", "").split()) for m in messages), len(words)]
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = FakeBackend() if os.getenv("LLM_BACKEND") == "fake" else OpenAIBackend()
+    return _backend
+
+
+def set_backend(backend):
+    """Tauscht das Backend aus (z. B. FakeBackend zum lokalen Ausprobieren) und leert den Cache."""
+    global _backend
+    _backend = backend
+    _cache.clear()
+
+
+# === Accounting ===
+def _count(model: str, **increments):
+    entry = stats.setdefault(model, {
+        "calls": 0, "cache_hits": 0, "stale_hits": 0, "coalesced": 0, "errors": 0,
+        "prompt_tokens": 0, "completion_tokens": 0, "latency_total": 0.0,
+    })
+    for key, value in increments.items():
+        entry[key] += value
+
+
+# === Cache ===
+def _cache_key(model: str, messages: list, params: dict) -> str:
+    payload = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cache_get(key: str, allow_stale: bool = False):
+    # Abgelaufene Einträge bleiben bis STALE_MAX_AGE als Notfallantwort erhalten
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    created, expires, reply = entry
+    now = time.monotonic()
+    if now > expires and (not allow_stale or now - created > STALE_MAX_AGE):
+        return None
+    _cache.move_to_end(key)
+    return reply
+
+
+def _cache_put(key: str, reply: str, ttl: float):
+    now = time.monotonic()
+    _cache[key] = (now, now + ttl, reply)
+    _cache.move_to_end(key)
+    while len(_cache) > CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+
+
+def invalidate():
+    _cache.clear()
+
+
+# === Zugriff ===
+async def _call(model: str, messages: list, params: dict) -> str:
+    started = time.monotonic()
+    try:
+        with tracing.span("io", "openai.complete"):
+            reply, (prompt_tokens, completion_tokens) = await outbound_policy.call_async(
+                "openai", get_backend().complete, model, messages, **params
+            )
+    except Exception:
+        _count(model, errors=1)
+        raise
+    _count(model, calls=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+           latency_total=time.monotonic() - started)
+    return reply
+
+
+async def complete(messages: list, model: str = DEFAULT_MODEL, cache_ttl: float = CACHE_TTL,
+                   allow_stale: bool = True, **params) -> str:
+    """Chat-Completion mit Cache und Zusammenlegung gleicher Anfragen.
+
+    Gleiche Prompts (Modell, Nachrichten, Parameter) werden cache_ttl Sekunden lang aus dem
+    Cache beantwortet; laufen sie gleichzeitig, teilen sie sich einen einzigen API-Aufruf.
+    cache_ttl=0 erzwingt einen neuen Aufruf. Fehler werden nicht gecacht; schlägt der Aufruf
+    auch nach den Wiederholungen fehl, wird eine abgelaufene Antwort (höchstens STALE_MAX_AGE alt)
+    geliefert, falls vorhanden; allow_stale=False verhindert das (z. B. für zeitgebundene Pushes).
+    """
+    key = _cache_key(model, messages, params)
+    if cache_ttl > 0:
+        reply = _cache_get(key)
+        if reply is not None:
+            _count(model, cache_hits=1)
+            return reply
+
+    task = _inflight.get(key)
+    owner = task is None
+    if owner:
+        task = asyncio.ensure_future(_call(model, messages, params))
+        _inflight[key] = task
+        task.add_done_callback(lambda done: _inflight.pop(key, None) if _inflight.get(key) is done else None)
+    else:
+        _count(model, coalesced=1)
+
+    try:
+        reply = await asyncio.shield(task)
+    except Exception as e:
+        # Lieber eine ältere Antwort als gar keine (z. B. Quota erschöpft, Dienst gestört)
+        stale = _cache_get(key, allow_stale=True) if cache_ttl > 0 and allow_stale else None
+        if stale is None:
+            raise
+        print(f"⚠️ GPT nicht erreichbar ({e}), nutze ältere Antwort aus dem Cache.")
+        _count(model, stale_hits=1)
+        return stale
+    if owner and cache_ttl > 0:
+        _cache_put(key, reply, cache_ttl)
+    return reply
+
+
+async def stream(messages: list, model: str = DEFAULT_MODEL, **params):
+    """Streamt eine Chat-Completion stückweise (ohne Cache), mit denselben Zählern wie complete()."""
+    started = time.monotonic()
+    usage = [0, 0]
+    attempt = 0
+    while True:
+        await asyncio.sleep(outbound_policy.admit("openai"))
+        received = False
+        try:
+            async for piece in get_backend().stream(model, messages, usage, **params):
+                if not received:
+                    tracing.observe("io", "openai.first_token", time.monotonic() - started)
+                received = True
+                yield piece
+        except Exception as e:
+            # Nur wiederholen, solange noch nichts beim Nutzer angekommen ist
+            if not received and outbound_policy.is_retryable(e) and attempt < outbound_policy.POLICIES["openai"][2]:
+                await asyncio.sleep(outbound_policy.backoff(attempt, e))
+                attempt += 1
+                continue
+            outbound_policy.record("openai", e)
+            _count(model, errors=1)
+            tracing.observe("io", "openai.stream", time.monotonic() - started, error=True)
+            raise
+        outbound_policy.record("openai")
+        break
+    tracing.observe("io", "openai.stream", time.monotonic() - started)
+    _count(model, calls=1, prompt_tokens=usage[0], completion_tokens=usage[1],
+           latency_total=time.monotonic() - started)
+
+
+def summary() -> str:
+    """Kurzübersicht der bisherigen Aufrufe je Modell."""
+    lines = []
+    for model, entry in stats.items():
+        avg = entry["latency_total"] / entry["calls"] if entry["calls"] else 0.0
+        lines.append(
+            f"{model}: {entry['calls']} Aufrufe, {entry['cache_hits']} Cache-Treffer, "
+            f"{entry['coalesced']} zusammengelegt, {entry['stale_hits']} veraltet, {entry['errors']} Fehler, "
+            f"{entry['prompt_tokens']}+{entry['completion_tokens']} Tokens, Ø {avg:.1f}s"
+        )
+    return "\n".join(lines) or "Noch keine GPT-Aufrufe."
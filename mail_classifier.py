@@ -0,0 +1,96 @@
+import os
+import re
+import json
+from typing import Optional
+
+# === Einstellungen ===
+FILTERS_FILE = os.getenv("MAIL_FILTERS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "mail_filters.json"))
+
+# Kompilierter Automat: (Muster, längste Phrase -> {Liste: passende Phrase})
+_matcher = None
+
+
+# === Automat ===
+def _trie_pattern(phrases) -> str:
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node) -> str:
+        alternatives = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alternatives:
+            return ""
+        if len(alternatives) == 1 and "" not in node:
+            return alternatives[0]
+        group = "(?:" + "|".join(alternatives) + ")"
+        return group + "?" if "" in node else group
+
+    return build(trie)
+
+
+def compile_matcher(config: dict):
+    """Baut aus allen Phrasenlisten einen einzigen Trie-Ausdruck.
+
+    Der Lookahead liefert an jeder Textposition die längste dort beginnende Phrase;
+    alle anderen Treffer an dieser Position sind deren Präfixe und stehen in der Tabelle.
+    So genügt ein Durchlauf über den Text für alle Listen (Teilstring-Semantik wie `in`).
+    """
+    lists_by_phrase = {}
+    for name, phrases in config.items():
+        for phrase in phrases:
+            lists_by_phrase.setdefault(phrase.lower(), set()).add(name)
+
+    prefix_table = {}
+    for phrase in lists_by_phrase:
+        hits = {}
+        for candidate in sorted(lists_by_phrase, key=len):
+            if phrase.startswith(candidate):
+                for name in lists_by_phrase[candidate]:
+                    hits.setdefault(name, candidate)
+        prefix_table[phrase] = hits
+
+    pattern = re.compile("(?=(" + _trie_pattern(lists_by_phrase) + "))")
+    return pattern, prefix_table
+
+
+def load_patterns(path: str = FILTERS_FILE):
+    global _matcher
+    with open(path, "r", encoding="utf-8") as f:
+        _matcher = compile_matcher(json.load(f))
+    return _matcher
+
+
+def classify(text_lower: str) -> dict:
+    """Listenname -> erste gefundene Phrase für alle Listen, die in text_lower vorkommen."""
+    if _matcher is None:
+        load_patterns()
+    pattern, prefix_table = _matcher
+    found = {}
+    for longest in pattern.findall(text_lower):
+        for name, phrase in prefix_table[longest].items():
+            found.setdefault(name, phrase)
+    return found
+
+
+# === Klassifikation ===
+def newsletter_phrase(snippet_lower: str) -> Optional[str]:
+    return classify(snippet_lower).get("newsletter_phrases")
+
+
+def is_service_sender(from_lower: str) -> bool:
+    return "service_senders" in classify(from_lower)
+
+
+def contains_question(text_lower: str) -> bool:
+    return "question_keywords" in classify(text_lower)
+
+
+def is_ignored_sender(sender_lower: str) -> bool:
+    return "ignored_senders" in classify(sender_lower)
+
+
+def expects_answer(body_lower: str) -> bool:
+    return "reply_keywords" in classify(body_lower)
@@ -1,24 +1,20 @@
 import datetime
-import base64
-import pickle
-import os
-from io import BytesIO
+import time
 from typing import List, Tuple
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from todoist_api_python.api import TodoistAPI
+from googleapiclient.errors import HttpError
+import mail_classifier
+import mail_state
+import single_flight
+from google_services import gmail_service, execute_batch
 
-# === ENV & SETUP ===
-TOKEN_PKL_BASE64 = os.getenv("TOKEN_PKL_BASE64")
-TODOIST_API_TOKEN = os.getenv("TODOIST_API_TOKEN")
+# Für die Auswertung genügen diese Header
+METADATA_HEADERS = ["From", "Subject"]
 
-if not TOKEN_PKL_BASE64:
-    raise RuntimeError("TOKEN_PKL_BASE64 nicht gesetzt")
+RECENT_QUERY = "newer_than:3d category:primary -from:noreply -from:no-reply"
+RECENT_DAYS = 3
 
-# === Load Gmail Credentials from token.pkl ===
-creds = pickle.load(BytesIO(base64.b64decode(TOKEN_PKL_BASE64)))
-gmail = build("gmail", "v1", credentials=creds)
-todoist = TodoistAPI(TODOIST_API_TOKEN)
+ARCHIVE_AFTER_DAYS = 7
+BATCH_MODIFY_SIZE = 1000
 
 
 def list_threads(query: str, strict: bool = False) -> List[str]:
@@ -27,13 +23,41 @@ def list_threads(query: str, strict: bool = False) -> List[str]:
             query += " category:primary"
         if "-from:noreply" not in query:
             query += " -from:noreply -from:no-reply"
-    response = gmail.users().threads().list(userId='me', q=query).execute()
-    return [t['id'] for t in response.get('threads', [])]
+    thread_ids = []
+    page_token = None
+    while True:
+        response = gmail_service().users().threads().list(
+            userId='me', q=query, maxResults=500, pageToken=page_token
+        ).execute()
+        thread_ids.extend(t['id'] for t in response.get('threads', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return thread_ids
 
 def get_thread_messages(thread_id: str):
-    thread = gmail.users().threads().get(userId='me', id=thread_id, format='metadata').execute()
+    thread = gmail_service().users().threads().get(
+        userId='me', id=thread_id, format='metadata', metadataHeaders=METADATA_HEADERS
+    ).execute()
     return thread.get("messages", [])
 
+def get_threads_messages(thread_ids: List[str]) -> dict:
+    """Lädt die Metadaten vieler Threads per Gmail-Batch (bis zu 100 Threads je Roundtrip)."""
+    service = gmail_service()
+    requests = [
+        service.users().threads().get(userId='me', id=thread_id, format='metadata', metadataHeaders=METADATA_HEADERS)
+        for thread_id in thread_ids
+    ]
+    threads = {}
+    for thread_id, result in zip(thread_ids, execute_batch(service, requests)):
+        if isinstance(result, HttpError) and result.resp.status == 404:
+            threads[thread_id] = []
+            continue
+        if isinstance(result, Exception):
+            print(f"⚠️ Fehler beim Laden von Thread {thread_id}: {result}")
+            continue
+        threads[thread_id] = result.get("messages", [])
+    return threads
+
 def extract_subject(msg):
     for h in msg.get("payload", {}).get("headers", []):
         if h["name"] == "Subject":
@@ -52,37 +76,21 @@ def is_unanswered(messages: List[dict]) -> bool:
     from_header = next((h["value"] for h in headers if h["name"].lower() == "from"), "")
     snippet = last_msg.get("snippet", "")
 
-    question_keywords = [
-        "?", "kannst du", "würden sie", "bitte", "könntest du", "was ist", "wann", "wie", "wo", "warum", "soll ich",
-        "can you", "could you", "please", "would you", "what is", "when", "how", "where", "why", "should I",
-        "kun je", "zou je", "alsjeblieft", "wat is", "wanneer", "hoe", "waar", "waarom", "moet ik"
-    ]
-
     snippet_lower = snippet.lower()
     from_header_lower = from_header.lower()
 
-    newsletter_phrases = [
-        "to unsubscribe", "google calendar", "event update", "termin wurde aktualisiert", "calendar invitation", "automated message", "you are receiving this", "no reply needed",
-        "nicht antworten", "automatisch generiert", "du erhältst diese nachricht", "abmelden", "gitpod",
-        "keine antwort erforderlich", "benachrichtigungseinstellungen", "email-einstellungen",
-        "ihre email wurde hinterlegt", "sie erhalten diese e-mail", "rufen sie das portal auf",
-        "please do not reply to this email", "chess.com customer support", "update your notification settings",
-        "this email was sent to", "download on the app store", "get it on google play",
-        "Game over", "passwort reset", "aktualisierte einladung", "bestätige deine transaktion", "termin abgesagt",
-        "einladung", "livestream", "transaction", "support", "kundenservice",
-        "dies ist keine antwortadresse", "kalendereinladung", "meeting invitation"
-    ]
-    for phrase in newsletter_phrases:
-        if phrase in snippet_lower:
-            print(f"🛑 Gefiltert durch Stichwort '{phrase}' im Snippet: {snippet_lower[:100]}")
-            return False
+    found = mail_classifier.classify(snippet_lower)
+    phrase = found.get("newsletter_phrases")
+    if phrase:
+        print(f"🛑 Gefiltert durch Stichwort '{phrase}' im Snippet: {snippet_lower[:100]}")
+        return False
 
-    if any(service in from_header_lower for service in ["calendar", "google", "no-reply", "noreply", "donotreply"]):
+    if mail_classifier.is_service_sender(from_header_lower):
         print(f"🛑 Gefiltert durch Absender '{from_header_lower}'")
         return False
 
     is_sent_by_me = "SENT" in last_msg.get("labelIds", [])
-    contains_question = any(kw in snippet_lower for kw in question_keywords)
+    contains_question = "question_keywords" in found
 
     if not is_sent_by_me:
         return contains_question
@@ -93,23 +101,103 @@ def is_unanswered(messages: List[dict]) -> bool:
 
     return False
 
+def list_message_ids(query: str) -> List[str]:
+    message_ids = []
+    page_token = None
+    while True:
+        response = gmail_service().users().messages().list(
+            userId='me', q=query, maxResults=500, pageToken=page_token
+        ).execute()
+        message_ids.extend(m['id'] for m in response.get('messages', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return message_ids
+
 def archive_old_emails():
-    old_threads = list_threads("older_than:7d label:inbox", strict=True)
-    for thread_id in old_threads:
-        try:
-            gmail.users().threads().modify(userId="me", id=thread_id, body={"removeLabelIds": ["INBOX"]}).execute()
-        except Exception as e:
-            print(f"⚠️ Fehler beim Archivieren von Thread {thread_id}: {e}")
+    """Archiviert Inbox-Nachrichten, die älter als ARCHIVE_AFTER_DAYS sind, per batchModify.
+
+    Das Wasserzeichen merkt sich die Grenze des letzten Laufs, damit bereits
+    abgearbeitete Zeiträume nicht erneut gelistet werden.
+    """
+    cutoff = int(time.time()) - ARCHIVE_AFTER_DAYS * 86400
+    watermark = mail_state.get_meta("archive_watermark")
+    query = f"in:inbox before:{cutoff}"
+    if watermark:
+        query += f" after:{watermark}"
+
+    message_ids = list_message_ids(query)
+    for offset in range(0, len(message_ids), BATCH_MODIFY_SIZE):
+        gmail_service().users().messages().batchModify(
+            userId="me",
+            body={"ids": message_ids[offset:offset + BATCH_MODIFY_SIZE], "removeLabelIds": ["INBOX"]}
+        ).execute()
+
+    mail_state.set_meta("archive_watermark", cutoff)
+    print(f"📦 {len(message_ids)} alte Mails archiviert.")
+
+async def archive_old_emails_job():
+    try:
+        await single_flight.shared_io("gmail", "archive_old_emails", archive_old_emails)
+    except Exception as e:
+        print(f"⚠️ Fehler beim Archivieren alter Mails: {e}")
+
+def _matches_recent_query(msg: dict, cutoff_ms: int) -> bool:
+    # Lokale Entsprechung von RECENT_QUERY für einzelne Nachrichten
+    if int(msg.get("internalDate", 0)) < cutoff_ms:
+        return False
+    labels = msg.get("labelIds", [])
+    # threads.list schließt Papierkorb und Spam implizit aus, die History API nicht
+    if "TRASH" in labels or "SPAM" in labels:
+        return False
+    categories = [l for l in labels if l.startswith("CATEGORY_")]
+    if categories and "CATEGORY_PERSONAL" not in categories:
+        return False
+    headers = msg.get("payload", {}).get("headers", [])
+    from_header = next((h["value"] for h in headers if h["name"].lower() == "from"), "").lower()
+    return "noreply" not in from_header and "no-reply" not in from_header
+
+def sync_recent_threads() -> List[Tuple[str, List[dict]]]:
+    """Aktualisiert den Thread-Bestand über die Gmail History API.
+
+    Nur beim ersten Lauf (oder abgelaufener historyId) wird RECENT_QUERY komplett
+    gescannt, danach werden ausschließlich geänderte Threads nachgeladen.
+    Threads, deren Abruf fehlschlägt (z. B. 429 im Batch), werden gemerkt und im
+    nächsten Lauf erneut geladen, auch wenn History sie dann nicht mehr meldet.
+    Liefert die passenden Threads, neueste zuerst.
+    """
+    cutoff_ms = int((time.time() - RECENT_DAYS * 86400) * 1000)
+    retry = set(mail_state.get_meta("summary_retry", []))
+    changed, cursor = mail_state.changed_thread_ids("summary")
+    if changed is None:
+        thread_ids = list(dict.fromkeys(list_threads(RECENT_QUERY) + sorted(retry)))
+        loaded = get_threads_messages(thread_ids)
+        mail_state.replace_threads(loaded)
+    else:
+        thread_ids = list(changed | retry)
+        loaded = get_threads_messages(thread_ids) if thread_ids else {}
+        mail_state.merge_threads(loaded)
+
+    failed = [thread_id for thread_id in thread_ids if thread_id not in loaded]
+    if failed:
+        print(f"⚠️ {len(failed)} Threads nicht geladen, nächster Lauf versucht es erneut.")
+    if failed or retry:
+        mail_state.set_meta("summary_retry", failed)
+    mail_state.prune(cutoff_ms)
+    mail_state.commit_cursor("summary", cursor)
+
+    recent = [
+        (thread_id, messages) for thread_id, messages in mail_state.threads().items()
+        if any(_matches_recent_query(m, cutoff_ms) for m in messages)
+    ]
+    recent.sort(key=lambda t: mail_state.last_internal_date(t[1]), reverse=True)
+    return recent
 
-async def check_mail_status() -> Tuple[str, List[dict]]:
-    archive_old_emails()
-    recent_threads = list_threads("newer_than:3d category:primary -from:noreply -from:no-reply")
+def collect_mail_status() -> Tuple[str, List[dict]]:
     incoming_mails = []
     outgoing_mails = []
     summary = ""
 
-    for thread_id in recent_threads:
-        messages = get_thread_messages(thread_id)
+    for thread_id, messages in sync_recent_threads():
         if not messages:
             continue
 
@@ -140,6 +228,11 @@ async def check_mail_status() -> Tuple[str, List[dict]]:
     return summary, incoming_mails + outgoing_mails
 
 
+async def check_mail_status() -> Tuple[str, List[dict]]:
+    """Mailstatus; überschneiden sich /mail und eine Zusammenfassung, teilen sie sich einen Abruf."""
+    return await single_flight.shared_io("gmail", "mail_status", collect_mail_status)
+
+
 async def create_mail_check_task(open_mails: List[dict]):
     if not open_mails:
         return
@@ -0,0 +1,115 @@
+import threading
+from typing import Optional, Set, Tuple
+from googleapiclient.errors import HttpError
+
+from google_services import gmail_service
+from storage import data_path, load_json, save_json_atomic
+
+# === Einstellungen ===
+STATE_FILE = data_path("gmail_state.json")
+
+_lock = threading.RLock()
+_state = None
+
+
+# === Persistenter Zustand ===
+# {"cursors": {Konsument: historyId}, "threads": {threadId: [Nachrichten (format=metadata)]}, "meta": {...}}
+def _load() -> dict:
+    global _state
+    if _state is None:
+        _state = load_json(STATE_FILE, None) or {"cursors": {}, "threads": {}}
+    return _state
+
+
+def save():
+    with _lock:
+        save_json_atomic(STATE_FILE, _load())
+
+
+# === History API ===
+def current_history_id() -> str:
+    return gmail_service().users().getProfile(userId="me").execute()["historyId"]
+
+
+def changed_thread_ids(consumer: str) -> Tuple[Optional[Set[str]], str]:
+    """Thread-IDs, die sich seit dem letzten commit_cursor() des Konsumenten geändert haben.
+
+    Liefert (None, cursor), wenn es noch keinen oder keinen gültigen Cursor mehr gibt;
+    der Aufrufer muss dann einmal vollständig scannen. Der neue Cursor wird erst mit
+    commit_cursor() übernommen, damit ein abgebrochener Lauf keine Änderungen verliert.
+    """
+    with _lock:
+        start = _load()["cursors"].get(consumer)
+    if not start:
+        return None, current_history_id()
+
+    service = gmail_service()
+    changed = set()
+    page_token = None
+    while True:
+        try:
+            response = service.users().history().list(
+                userId="me", startHistoryId=start, maxResults=500, pageToken=page_token
+            ).execute()
+        except HttpError as e:
+            # 404: historyId zu alt (Gmail hält die History nur begrenzt vor)
+            if e.resp.status == 404:
+                return None, current_history_id()
+            raise
+        for record in response.get("history", []):
+            for msg in record.get("messages", []):
+                changed.add(msg["threadId"])
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return changed, response.get("historyId", start)
+
+
+def commit_cursor(consumer: str, history_id: str):
+    with _lock:
+        _load()["cursors"][consumer] = history_id
+        save()
+
+
+def get_meta(key: str, default=None):
+    with _lock:
+        return _load().setdefault("meta", {}).get(key, default)
+
+
+def set_meta(key: str, value):
+    with _lock:
+        _load().setdefault("meta", {})[key] = value
+        save()
+
+
+# === Thread-Bestand ===
+def replace_threads(threads: dict):
+    with _lock:
+        _load()["threads"] = {tid: msgs for tid, msgs in threads.items() if msgs}
+
+
+def merge_threads(threads: dict):
+    """Übernimmt neu geladene Threads; leere Threads (gelöscht) werden entfernt."""
+    with _lock:
+        stored = _load()["threads"]
+        for thread_id, messages in threads.items():
+            if messages:
+                stored[thread_id] = messages
+            else:
+                stored.pop(thread_id, None)
+
+
+def prune(cutoff_ms: int):
+    """Entfernt Threads, deren letzte Nachricht älter als cutoff_ms ist."""
+    with _lock:
+        stored = _load()["threads"]
+        for thread_id in [tid for tid, msgs in stored.items() if last_internal_date(msgs) < cutoff_ms]:
+            del stored[thread_id]
+
+
+def threads() -> dict:
+    with _lock:
+        return dict(_load()["threads"])
+
+
+def last_internal_date(messages: list) -> int:
+    return max((int(m.get("internalDate", 0)) for m in messages), default=0)
@@ -1,13 +1,26 @@
 import os
 import asyncio
-import base64
-import pickle
+import importlib
 import datetime
 import pytz
-import requests
 
-from mail_handler import check_mail_status, create_mail_check_task
+from mail_handler import check_mail_status, create_mail_check_task, archive_old_emails_job
+import todoist_client
+from todoist_client import get_relevant_tasks_by_day
+from async_io import run_io
+import price_feed
+import delivery_ledger
+import single_flight
+import tracing
+import http_session
+from storage import data_path
+from calendar_events import get_events_by_day
+from agenda import render_agenda, send_chunks
+from date_parsing import find_dates_async
+from day_snapshot import get_day_snapshot, prewarm as prewarm_snapshot
+from modules.gpt_handler import gpt_handlers
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from telegram import Update, Bot
 from typing import List, Tuple
 from telegram.ext import (
@@ -17,130 +30,69 @@ from telegram.ext import (
     ContextTypes,
     filters,
 )
-from googleapiclient.discovery import build
-from dateparser.search import search_dates
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from openai import AsyncOpenAI
-
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from apscheduler.jobstores.memory import MemoryJobStore
+import llm_gateway
 
 # === ENV ===
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 CHAT_ID = int(os.getenv("CHAT_ID", "8011259706"))
-TOKEN_PKL_BASE64 = os.getenv("TOKEN_PKL_BASE64")
-
-# === token.pkl erzeugen, falls nötig ===
-if not os.path.exists("token.pkl") and TOKEN_PKL_BASE64:
-    with open("token.pkl", "wb") as f:
-        f.write(base64.b64decode(TOKEN_PKL_BASE64))
-    print("✅ token.pkl aus Umgebungsvariable erzeugt.")
-
-# === Kalenderintegration ===
-# === Kalenderintegration ===
-def get_calendar_events(start, end):
-    with open("token.pkl", "rb") as token:
-        creds = pickle.load(token)
-    service = build("calendar", "v3", credentials=creds)
-
-    events_output = []
-    calendar_list = service.calendarList().list().execute()
-
-    for cal in calendar_list.get("items", []):
-        cal_name = cal.get("summary", "(kein Name)")
-        events_result = service.events().list(
-            calendarId=cal["id"],
-            timeMin=start.isoformat(),
-            timeMax=end.isoformat(),
-            singleEvents=True,
-            orderBy="startTime"
-        ).execute()
-
-        events = events_result.get("items", [])
-        for event in events:
-            title = event.get("summary", "(kein Titel)")
-            start_time = event.get("start", {}).get("dateTime") or event.get("start", {}).get("date")
-            end_time = event.get("end", {}).get("dateTime") or event.get("end", {}).get("date")
-            events_output.append({
-                "summary": title,
-                "start": start_time,
-                "end": end_time,
-                "calendar": cal_name
-            })
-
-    return events_output
 
+# Befehle sollen aktuelle Termine zeigen, Zusammenfassungen nutzen den vorbereiteten Snapshot
+COMMAND_SNAPSHOT_MAX_AGE = 60
+
+# === Kalender ===
 async def kalender_heute(update: Update, context: ContextTypes.DEFAULT_TYPE):
     print("✅ /kalender empfangen")
 
     tz = pytz.timezone("Europe/Berlin")
     now = datetime.datetime.now(tz)
     start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    end = start + datetime.timedelta(days=1)
 
     try:
-        events = get_calendar_events(start, end)
+        # /kalender zeigt keine Aufgaben, also nicht auf Todoist warten
+        snapshot = await get_day_snapshot(start.date(), max_age=COMMAND_SNAPSHOT_MAX_AGE, include_tasks=False)
+        if snapshot["events_error"]:
+            raise snapshot["events_error"]
+        events = snapshot["events"]
         if events:
-            grouped = {}
-            for e in events:
-                cal = e.get("calendar", "Unbekannt")
-                grouped.setdefault(cal, []).append(e)
-
-            msg = f"🗓️ Termine heute ({start.strftime('%A, %d.%m.%Y')}):\n"
-            for cal_name, evts in grouped.items():
-                msg += f"\n📘 {cal_name}:\n"
-                for e in evts:
-                    start_str = e['start'][11:16] if 'T' in e['start'] else ''
-                    end_str = e['end'][11:16] if 'T' in e['end'] else ''
-                    zeit = f"{start_str}-{end_str}" if start_str and end_str else "(ganztägig)"
-                    msg += f"- {zeit} {e['summary']}\n"
+            msg = render_agenda(events, start.date(), header=f"🗓️ Termine heute ({start.strftime('%A, %d.%m.%Y')}):")
         else:
             msg = "Heute stehen keine Termine im Kalender."
     except Exception as e:
         msg = f"❌ Fehler beim Laden des Kalenders:\n{e}"
 
-    await update.message.reply_text(msg)
+    await send_chunks(update.message.reply_text, msg)
 
 
 async def global_frage(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_input = update.message.text
     tz = pytz.timezone("Europe/Berlin")
-    parsed = search_dates(user_input, languages=["de"])
+    # Schnellpfad und Cache laufen direkt; nur der seltene dateparser-Fallback geht in den Threadpool
+    daten = await find_dates_async(user_input)
 
-    if not parsed:
+    if not daten:
         return
 
-    antworten = []
-    for _, dt in parsed:
-        dt = dt.astimezone(tz)
-        start = dt.replace(hour=0, minute=0, second=0, microsecond=0)
-        end = start + datetime.timedelta(days=1)
-        events = get_calendar_events(start, end)
+    # Zusammenhängende Tage gemeinsam laden und danach im Speicher auf die Tage verteilen
+    tage = [tz.localize(datetime.datetime.combine(d, datetime.time())) for d in daten]
+    termine_je_tag = await get_events_by_day(daten)
+    tage_daten = [t.date() for t in tage]
+    aufgaben_je_tag = await single_flight.shared_io(
+        "todoist", "tasks_by_day", get_relevant_tasks_by_day, tage_daten, scope=tuple(tage_daten)
+    )
 
-        tagestext = f"🗓️ {start.strftime('%A, %d.%m.%Y')}:\n"
+    antworten = []
+    for start in tage:
+        events = termine_je_tag[start.date()]
 
-        if events:
-            grouped = {}
-            for e in events:
-                cal = e.get("calendar", "Unbekannt")
-                grouped.setdefault(cal, []).append(e)
-
-            for cal_name, evts in grouped.items():
-                tagestext += f"\n📘 {cal_name}:\n"
-                for e in evts:
-                    start_str = e['start'][11:16] if 'T' in e['start'] else ''
-                    end_str = e['end'][11:16] if 'T' in e['end'] else ''
-                    zeit = f"{start_str}-{end_str}" if start_str and end_str else "(ganztägig)"
-                    tagestext += f"- {zeit} {e['summary']}\n"
-        else:
-            tagestext += "Keine Termine.\n"
+        tagestext = render_agenda(events, start.date(), header=f"🗓️ {start.strftime('%A, %d.%m.%Y')}:")
 
         # 📌 Todoist-Aufgaben ergänzen
-        aufgaben = get_relevant_tasks(start.date())
-        tagestext += "\n📝 Aufgaben:\n" + "\n".join(aufgaben)
-
-        antworten.append(tagestext)
+        aufgaben = aufgaben_je_tag[start.date()]
+        antworten.append("".join([tagestext, "\n📝 Aufgaben:\n", "\n".join(aufgaben)]))
 
-    await update.message.reply_text("\n\n".join(antworten))
+    await send_chunks(update.message.reply_text, "\n\n".join(antworten))
 
 # Todoist
 
@@ -152,14 +104,8 @@ async def todo(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Kein Todoist-Token gefunden.")
         return
 
-    headers = {
-        "Authorization": f"Bearer {token}"
-    }
-
     try:
-        response = requests.get("https://api.todoist.com/rest/v2/tasks", headers=headers)
-        response.raise_for_status()
-        tasks = response.json()
+        tasks = await run_io("todoist", todoist_client.get_tasks)
 
         if not tasks:
             msg = "✅ Keine offenen Aufgaben."
@@ -174,59 +120,33 @@ async def todo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except Exception as e:
         await update.message.reply_text(f"❌ Fehler beim Abrufen der Aufgaben:\n{e}")
         
-# todoist versammeln für update
-def get_relevant_tasks(start_date: datetime.date):
-    token = os.getenv("TODOIST_API_TOKEN")
-    if not token:
-        return ["❌ Kein Todoist-Token gefunden."]
-
-    headers = {
-        "Authorization": f"Bearer {token}"
-    }
-
-    try:
-        response = requests.get("https://api.todoist.com/rest/v2/tasks", headers=headers)
-        response.raise_for_status()
-        tasks = response.json()
-
-        relevant = []
-        for task in tasks:
-            due = task.get("due", {})
-            due_date_str = due.get("date") if due else None
-            if due_date_str:
-                try:
-                    due_date = datetime.date.fromisoformat(due_date_str[:10])
-                except ValueError:
-                    continue
-                if due_date != start_date:
-                    continue
-            content = task.get("content", "(kein Titel)")
-            relevant.append(f"- [ ] {content}")
-
-        return relevant if relevant else ["✅ Keine Aufgaben für diesen Tag."]
-
-    except Exception as e:
-        return [f"❌ Fehler beim Laden der Todoist-Aufgaben:\n{e}"]
-
 import datetime
-import requests
+
+async def news_update(prompt: str, allow_stale: bool = True) -> str:
+    """GPT-News über das LLM-Gateway; gleiche Prompts innerhalb der Cache-Zeit kosten keinen neuen Aufruf."""
+    return await llm_gateway.complete(
+        [
+            {"role": "system", "content": "Du bist ein sachlicher Nachrichten-Assistent."},
+            {"role": "user", "content": prompt}
+        ],
+        model="gpt-4",
+        allow_stale=allow_stale,
+        temperature=0.3,
+        max_tokens=400,
+    )
 
 async def ripple_sec_news_check():
     # 📆 Dynamisches Datum/Zeit
     now = datetime.datetime.now().strftime("%d.%m.%Y, %H:%M")
 
-    # 📊 Hole Live-Preise von CoinGecko
+    # 📊 Kurse aus dem Puffer (price_feed pollt CoinGecko im Hintergrund)
     try:
-        price_response = requests.get(
-            "https://api.coingecko.com/api/v3/simple/price",
-            params={"ids": "ripple,hedera-hashgraph,solana,bitcoin,ethereum", "vs_currencies": "usd"}
+        prices = await price_feed.current_prices()
+        kurs_xrp = price_feed.price_line(prices, "ripple")
+        weitere_kurse = "\n".join(
+            f"- {label}: {price_feed.price_line(prices, coin)}"
+            for coin, label in [("hedera-hashgraph", "HBAR"), ("solana", "SOL"), ("bitcoin", "BTC"), ("ethereum", "ETH")]
         )
-        prices = price_response.json()
-        preis_xrp = prices["ripple"]["usd"]
-        preis_hbar = prices["hedera-hashgraph"]["usd"]
-        preis_sol = prices["solana"]["usd"]
-        preis_btc = prices["bitcoin"]["usd"]
-        preis_eth = prices["ethereum"]["usd"]
     except Exception as e:
         print("Fehler beim Abrufen der Preise:", e)
         return
@@ -239,16 +159,8 @@ async def ripple_sec_news_check():
     )
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "Du bist ein sachlicher Nachrichten-Assistent."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=400,
-        )
-        update = response.choices[0].message.content.strip()
+        # Keine ältere Antwort als neues Update pushen, wenn GPT gerade nicht erreichbar ist
+        update = await news_update(prompt, allow_stale=False)
     except Exception as e:
         print("Fehler bei GPT-Antwort:", e)
         return
@@ -256,13 +168,10 @@ async def ripple_sec_news_check():
     # 📲 Telegram-Nachricht formatieren
     message = (
         f"📢 *Ripple & XRP Update – {now}*\n\n"
-        f"- *Kurs:* XRP bei {preis_xrp} USD\n"
+        f"- *Kurs:* XRP bei {kurs_xrp}\n"
         f"- *News:* {update}\n\n"
         "🪙 *Weitere Kurse:*\n"
-        f"- HBAR: {preis_hbar} USD\n"
-        f"- SOL: {preis_sol} USD\n"
-        f"- BTC: {preis_btc} USD\n"
-        f"- ETH: {preis_eth} USD"
+        f"{weitere_kurse}"
     )
 
     if "Keine relevanten Updates" not in update:
@@ -276,16 +185,12 @@ async def xrp_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # Preise abrufen
     try:
-        price_response = requests.get(
-            "https://api.coingecko.com/api/v3/simple/price",
-            params={"ids": "ripple,hedera-hashgraph,solana,bitcoin,ethereum", "vs_currencies": "usd"}
+        prices = await price_feed.current_prices()
+        kurs_xrp = price_feed.price_line(prices, "ripple")
+        weitere_kurse = "\n".join(
+            f"- {label}: {price_feed.price_line(prices, coin)}"
+            for coin, label in [("hedera-hashgraph", "HBAR"), ("solana", "SOL"), ("bitcoin", "BTC"), ("ethereum", "ETH")]
         )
-        prices = price_response.json()
-        preis_xrp = prices["ripple"]["usd"]
-        preis_hbar = prices["hedera-hashgraph"]["usd"]
-        preis_sol = prices["solana"]["usd"]
-        preis_btc = prices["bitcoin"]["usd"]
-        preis_eth = prices["ethereum"]["usd"]
     except Exception as e:
         await update.message.reply_text("Fehler beim Abrufen der Preise.")
         return
@@ -298,16 +203,7 @@ async def xrp_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "Du bist ein sachlicher Nachrichten-Assistent."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=400,
-        )
-        update_text = response.choices[0].message.content.strip()
+        update_text = await news_update(prompt)
     except Exception as e:
         await update.message.reply_text("Fehler beim Abrufen der News.")
         return
@@ -315,116 +211,185 @@ async def xrp_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Antwort zusammenbauen
     text = (
         f"📢 *Ripple & XRP Update – {now}*\n\n"
-        f"- *Kurs:* XRP bei {preis_xrp} USD\n"
+        f"- *Kurs:* XRP bei {kurs_xrp}\n"
         f"- *News:* {update_text}\n\n"
-        f"🪙 *Weitere Kurse:*\n"
-        f"- HBAR: {preis_hbar} USD\n"
-        f"- SOL: {preis_sol} USD\n"
-        f"- BTC: {preis_btc} USD\n"
-        f"- ETH: {preis_eth} USD"
+        "🪙 *Weitere Kurse:*\n"
+        f"{weitere_kurse}"
     )
 
     await update.message.reply_text(text, parse_mode="Markdown")
 
 # === Tageszusammenfassungen ===
-def init_scheduler(app):
-    scheduler = AsyncIOScheduler(timezone="Europe/Berlin")
+# Jobs liegen im persistenten Job-Store und werden dort als Funktionsreferenz gespeichert;
+# deshalb sind sie Modulfunktionen und greifen über _app auf den Bot zu.
+_app = None
 
-    for hour in [8, 14, 20]:
-        scheduler.add_job(
-            ripple_sec_news_check,
-            CronTrigger(hour=hour, minute=0),
-            name=f"Ripple SEC News {hour}h"
-        )
-
-    #scheduler.start()
-    async def send_morning_summary():
-        tz = pytz.timezone("Europe/Berlin")
-        now = datetime.datetime.now(tz)
-        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        end = start + datetime.timedelta(days=1)
+SCHEDULER_DB_URL = f"sqlite:///{data_path('scheduler.db')}"
 
-        try:
-            events = get_calendar_events(start, end)
-
-            if events:
-                grouped = {}
-                for e in events:
-                    cal = e.get("calendar", "Unbekannt")
-                    grouped.setdefault(cal, []).append(e)
-
-                text = f"Guten Morgen! Deine Termine heute ({start.strftime('%A, %d.%m.%Y')}):\n"
-                for cal_name, evts in grouped.items():
-                    text += f"\n📅 {cal_name}:\n"
-                    for e in evts:
-                        start_str = e['start'][11:16] if 'T' in e['start'] else ''
-                        end_str = e['end'][11:16] if 'T' in e['end'] else ''
-                        zeit = f"{start_str}-{end_str}" if start_str and end_str else "(ganztägig)"
-                        text += f"- {zeit} {e['summary']}\n"
-            else:
-                text = "Guten Morgen! Heute stehen keine Termine im Kalender."
 
-        except Exception as e:
-            text = f"❌ Fehler beim Laden des Kalenders:\n{e}"
+async def send_telegram_message(text: str):
+    await _app.bot.send_message(chat_id=CHAT_ID, text=text, parse_mode="Markdown")
 
-        # Aufgaben
-        today = now.date()
-        tasks = get_relevant_tasks(today)
-        if tasks:
-            text += "\n\n📝 Aufgaben heute:\n" + "\n".join(f"- {t}" for t in tasks)
-        else:
-            text += "\n\n📝 Heute stehen keine Aufgaben an."
 
-        # Mailstatus prüfen
-        mail_summary, open_mails = await check_mail_status()
-        if mail_summary:
-            text += "\n\n" + mail_summary
-        if open_mails:
-            await create_mail_check_task(open_mails)
+async def _morning_summary_text() -> str:
+    tz = pytz.timezone("Europe/Berlin")
+    now = datetime.datetime.now(tz)
+    start = now.replace(hour=0, minute=0, second=0, microsecond=0)
 
-        # Nachricht senden
-        await app.bot.send_message(chat_id=CHAT_ID, text=text)
+    # Vom Prewarm-Job vorbereitet: Termine, Aufgaben und Mailstatus liegen schon bereit
+    snapshot = await get_day_snapshot(now.date(), include_mail=True)
 
-    async def send_evening_summary():
-        tz = pytz.timezone("Europe/Berlin")
-        now = datetime.datetime.now(tz)
-        start = (now + datetime.timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-        end = start + datetime.timedelta(days=1)
+    try:
+        if snapshot["events_error"]:
+            raise snapshot["events_error"]
+        events = snapshot["events"]
 
-        events = get_calendar_events(start, end)
         if events:
-            grouped = {}
-            for e in events:
-                cal = e.get("calendar", "Unbekannt")
-                grouped.setdefault(cal, []).append(e)
-
-            text = f"🌙 Vorschau auf morgen ({start.strftime('%A, %d.%m.%Y')}):\n"
-            for cal_name, evts in grouped.items():
-                text += f"\n📘 {cal_name}:\n"
-                for e in evts:
-                    start_str = e['start'][11:16] if 'T' in e['start'] else ''
-                    end_str = e['end'][11:16] if 'T' in e['end'] else ''
-                    zeit = f"{start_str}-{end_str}" if start_str and end_str else "(ganztägig)"
-                    text += f"- {zeit} {e['summary']}\n"
+            text = render_agenda(
+                events,
+                start.date(),
+                header=f"Guten Morgen! Deine Termine heute ({start.strftime('%A, %d.%m.%Y')}):",
+                calendar_format="\n📅 {calendar}:",
+            )
         else:
-            text = "🌙 Morgen stehen keine Termine im Kalender."
+            text = "Guten Morgen! Heute stehen keine Termine im Kalender."
 
-        tomorrow = (now + datetime.timedelta(days=1)).date()
-        tasks = get_relevant_tasks(tomorrow)
-        if tasks:
-            text += "\n\n📝 Aufgaben morgen:\n" + "\n".join(f"- {t}" for t in tasks)
-        else:
-            text += "\n\n📝 Morgen stehen keine Aufgaben an."
+    except Exception as e:
+        text = f"❌ Fehler beim Laden des Kalenders:\n{e}"
+
+    # Aufgaben
+    tasks = snapshot["tasks"]
+    if tasks:
+        text += "\n\n📝 Aufgaben heute:\n" + "\n".join(f"- {t}" for t in tasks)
+    else:
+        text += "\n\n📝 Heute stehen keine Aufgaben an."
 
-        await app.bot.send_message(chat_id=CHAT_ID, text=text)
+    # Mailstatus prüfen
+    mail_summary, open_mails = snapshot["mail_summary"], snapshot["open_mails"]
+    if mail_summary:
+        text += "\n\n" + mail_summary
+    if open_mails:
+        await create_mail_check_task(open_mails)
 
-    # Scheduler-Jobs
-    scheduler.add_job(send_morning_summary, trigger="cron", hour=6, minute=30)
-    scheduler.add_job(send_morning_summary, trigger="cron", hour=7, minute=30)
-    scheduler.add_job(send_morning_summary, trigger="cron", hour=10, minute=0)
-    scheduler.add_job(send_morning_summary, trigger="cron", hour=15, minute=0)
-    scheduler.add_job(send_evening_summary, trigger="cron", hour=21, minute=0)
-    scheduler.start()
+    return text
+
+
+async def _evening_summary_text() -> str:
+    tz = pytz.timezone("Europe/Berlin")
+    now = datetime.datetime.now(tz)
+    start = (now + datetime.timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    snapshot = await get_day_snapshot(start.date())
+    if snapshot["events_error"]:
+        raise snapshot["events_error"]
+    events = snapshot["events"]
+    if events:
+        text = render_agenda(events, start.date(), header=f"🌙 Vorschau auf morgen ({start.strftime('%A, %d.%m.%Y')}):")
+    else:
+        text = "🌙 Morgen stehen keine Termine im Kalender."
+
+    tasks = snapshot["tasks"]
+    if tasks:
+        text += "\n\n📝 Aufgaben morgen:\n" + "\n".join(f"- {t}" for t in tasks)
+    else:
+        text += "\n\n📝 Morgen stehen keine Aufgaben an."
+
+    return text
+
+
+async def _deliver_once(kind: str, slot: str, build_text):
+    """Sendet eine Zusammenfassung höchstens einmal pro Tag und Slot, auch über Neustarts hinweg."""
+    key = f"{kind}:{datetime.datetime.now(pytz.timezone('Europe/Berlin')).date().isoformat()}:{slot}"
+    status = await run_io("ledger", delivery_ledger.claim, key)
+    if status == "sent":
+        print(f"↩️ {key} wurde bereits versendet.")
+        return
+    if status == "sending":
+        print(f"⏳ {key} wird gerade versendet.")
+        return
+    try:
+        text = await build_text()
+        await send_chunks(_app.bot.send_message, text, chat_id=CHAT_ID)
+    except BaseException:
+        await run_io("ledger", delivery_ledger.release, key)
+        raise
+    await run_io("ledger", delivery_ledger.confirm, key)
+
+
+async def send_morning_summary(slot: str):
+    await _deliver_once("morning", slot, _morning_summary_text)
+
+
+async def send_evening_summary(slot: str):
+    await _deliver_once("evening", slot, _evening_summary_text)
+
+
+def init_scheduler(app):
+    # SQLAlchemy braucht ~0,2s zum Import; erst hier laden, nachdem das Polling läuft
+    from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+
+    global _app
+    _app = app
+
+    scheduler = AsyncIOScheduler(
+        timezone="Europe/Berlin",
+        jobstores={
+            "default": SQLAlchemyJobStore(url=SCHEDULER_DB_URL),
+            # Kurzlebige Jobs, die nach einem Neustart nicht nachgeholt werden müssen
+            "memory": MemoryJobStore(),
+        },
+        job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": 300},
+    )
+
+    # Pausiert starten: der persistente Store ist geladen, aber noch läuft nichts
+    tracing.trace_scheduler(scheduler)
+    scheduler.start(paused=True)
+    registered = set()
+
+    def cron(hour: int, minute: int):
+        return CronTrigger(hour=hour, minute=minute, timezone="Europe/Berlin")
+
+    def add(job_id: str, func, trigger, misfire_grace_time: int, jobstore: str = "default", **job_args):
+        """Legt einen Job an oder aktualisiert ihn; ein unveränderter Trigger behält seinen nächsten
+        (ggf. verpassten) Termin, damit Läufe während eines Neustarts nachgeholt werden."""
+        registered.add(job_id)
+        existing = scheduler.get_job(job_id, jobstore=jobstore)
+        if existing is not None and str(existing.trigger) == str(trigger):
+            scheduler.modify_job(job_id, jobstore=jobstore, func=func, name=job_id,
+                                 misfire_grace_time=misfire_grace_time, **job_args)
+        else:
+            scheduler.add_job(func, trigger, id=job_id, name=job_id, jobstore=jobstore, replace_existing=True,
+                              misfire_grace_time=misfire_grace_time, **job_args)
+
+    for hour in [8, 14, 20]:
+        add(f"ripple_news_{hour:02d}", ripple_sec_news_check, cron(hour=hour, minute=0), 30 * 60)
+
+    # Verpasste Zusammenfassungen (Neustart, Rollback) werden bis zu einer Stunde später nachgeholt
+    for hour, minute in [(6, 30), (7, 30), (10, 0), (15, 0)]:
+        slot = f"{hour:02d}:{minute:02d}"
+        add(f"morning_summary_{slot}", send_morning_summary, cron(hour=hour, minute=minute), 60 * 60,
+            kwargs={"slot": slot})
+    add("evening_summary_21:00", send_evening_summary, cron(hour=21, minute=0), 60 * 60,
+        kwargs={"slot": "21:00"})
+    add("archive_old_emails", archive_old_emails_job, cron(hour=5, minute=0), 6 * 60 * 60)
+
+    # Snapshots kurz vor jedem Versand vorbereiten, damit pünktlich gesendet wird
+    for hour, minute in [(6, 25), (7, 25), (9, 55), (14, 55)]:
+        add(f"prewarm_{hour:02d}:{minute:02d}", prewarm_snapshot, cron(hour=hour, minute=minute), 5 * 60,
+            jobstore="memory", kwargs={"day_offset": 0, "include_mail": True})
+    add("prewarm_20:55", prewarm_snapshot, cron(hour=20, minute=55), 5 * 60,
+        jobstore="memory", kwargs={"day_offset": 1, "include_mail": False})
+
+    # Kurse im Hintergrund sammeln; /xrp und die Ripple-Updates lesen nur aus dem Puffer
+    add("price_poll", price_feed.poll, IntervalTrigger(seconds=price_feed.POLL_INTERVAL), 60, jobstore="memory",
+        next_run_time=datetime.datetime.now(pytz.timezone("Europe/Berlin")))
+
+    # Jobs früherer Versionen, die es nicht mehr gibt, aus dem persistenten Store entfernen
+    for job in scheduler.get_jobs(jobstore="default"):
+        if job.id not in registered:
+            scheduler.remove_job(job.id, jobstore="default")
+
+    scheduler.resume()
 
 async def mail_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     summary, open_mails = await check_mail_status()
@@ -440,24 +405,72 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def ping(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("peng")
 
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    coalesced = "\n".join(
+        f"{service}.{operation}: {count}×" for (service, operation), count in sorted(single_flight.stats.items())
+    )
+    text = (
+        f"📊 Laufzeiten seit dem Start (p50/p95)\n\n{tracing.summary()}\n\n"
+        f"🤖 GPT\n{llm_gateway.summary()}\n\n"
+        f"🔌 HTTP-Verbindungen\n{http_session.summary()}\n\n"
+        f"🔗 Zusammengelegte Abrufe\n{coalesced or 'Keine.'}"
+    )
+    await send_chunks(update.message.reply_text, text)
+
 # === Main Setup ===
+# Schwere Bibliotheken, die erst bei Bedarf importiert werden; nach dem Start im Hintergrund vorladen,
+# damit die erste Nachricht nicht auf den Import warten muss
+WARM_UP_MODULES = [
+    "dateparser.search",
+    "googleapiclient.discovery",
+    "googleapiclient.http",
+    "google_auth_httplib2",
+    "google.auth.transport.requests",
+    "requests",
+    "openai",
+]
+
+
+async def warm_up_imports():
+    for name in WARM_UP_MODULES:
+        try:
+            await run_io("startup", importlib.import_module, name)
+        except Exception as e:
+            print(f"⚠️ Vorladen von {name} fehlgeschlagen: {e}")
+
 async def setup_application():
-    app = Application.builder().token(BOT_TOKEN).build()
+    # Updates parallel verarbeiten: ein langer /frage-Stream oder ein langsamer /mail-Abruf
+    # soll andere Befehle und Chats nicht blockieren
+    app = Application.builder().token(BOT_TOKEN).concurrent_updates(True).build()
     await app.bot.delete_webhook(drop_pending_updates=True)
 
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("ping", ping))
-    app.add_handler(CommandHandler("kalender", kalender_heute))
-    app.add_handler(CommandHandler("mail", mail_command))
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, global_frage))
-    app.add_handler(CommandHandler("xrp", xrp_command))
-
-    init_scheduler(app)
+    def add(handler):
+        # Jeder Handler wird für /stats und den Metrik-Endpunkt gemessen
+        if isinstance(handler, CommandHandler):
+            name = "/" + min(handler.commands)
+        else:
+            name = handler.callback.__name__
+        handler.callback = tracing.traced("handler", name)(handler.callback)
+        app.add_handler(handler)
+
+    add(CommandHandler("start", start))
+    add(CommandHandler("ping", ping))
+    add(CommandHandler("kalender", kalender_heute))
+    add(CommandHandler("mail", mail_command))
+    add(MessageHandler(filters.TEXT & ~filters.COMMAND, global_frage))
+    add(CommandHandler("xrp", xrp_command))
+    add(CommandHandler("stats", stats_command))
+    for handler in gpt_handlers:
+        add(handler)
 
     await app.initialize()
     await app.start()
     await app.updater.start_polling()
     print("✅ Polling gestartet.")
+
+    init_scheduler(app)
+    tracing.start_exporter()
+    asyncio.create_task(warm_up_imports())
     print("✅ Bot läuft auf Fly.io.")
     await asyncio.Event().wait()
 
@@ -1,56 +1,27 @@
 import datetime
 import pytz
-import pickle
-import os
-import base64
 from telegram import Update
 from telegram.ext import CommandHandler, ContextTypes
-from googleapiclient.discovery import build
+from google_services import calendar_service
+from calendar_events import get_calendar_events
+from agenda import render_agenda, send_chunks
 
 # === Google Calendar Service laden ===
 def get_calendar_service():
-    if not os.path.exists("token.pkl"):
-        encoded = os.getenv("TOKEN_PKL_BASE64")
-        if not encoded:
-            raise ValueError("TOKEN_PKL_BASE64 fehlt!")
-        with open("token.pkl", "wb") as f:
-            f.write(base64.b64decode(encoded))
-
-    with open("token.pkl", "rb") as token:
-        creds = pickle.load(token)
-    return build("calendar", "v3", credentials=creds)
+    return calendar_service()
 
 # === Handlerfunktion für heute ===
 async def kalender_heute(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tz = pytz.timezone("Europe/Berlin")
     now = datetime.datetime.now(tz)
-    start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
-    end_of_day = now.replace(hour=23, minute=59, second=59, microsecond=999999).isoformat()
+    start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    end_of_day = now.replace(hour=23, minute=59, second=59, microsecond=999999)
 
     try:
-        service = get_calendar_service()
-        calendar_list = service.calendarList().list().execute()
-        events_output = []
-
-        for cal in calendar_list.get("items", []):
-            events_result = service.events().list(
-                calendarId=cal["id"],
-                timeMin=start_of_day,
-                timeMax=end_of_day,
-                singleEvents=True,
-                orderBy="startTime"
-            ).execute()
-
-            events = events_result.get("items", [])
-            if events:
-                events_output.append(f"*{cal.get('summary')}*:")
-                for event in events:
-                    start = event["start"].get("dateTime", event["start"].get("date"))
-                    title = event.get("summary", "(kein Titel)")
-                    events_output.append(f"  - {start}: {title}")
-        
-        if events_output:
-            await update.message.reply_text("\n".join(events_output), parse_mode="Markdown")
+        events = await get_calendar_events(start_of_day, end_of_day)
+        if events:
+            text = render_agenda(events, now.date(), calendar_format="*{calendar}*:", event_format="  - {time}: {summary}")
+            await send_chunks(update.message.reply_text, text, parse_mode="Markdown")
         else:
             await update.message.reply_text("Heute stehen keine Termine an.")
     except Exception as e:
@@ -1,32 +1,76 @@
-import os
+import time
 from telegram import Update
 from telegram.ext import CommandHandler, ContextTypes
-from openai import OpenAI
 
-openai_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=openai_key)
+import llm_gateway
+import conversation_store
+from agenda import split_message
+
+# Telegram begrenzt Bearbeitungen; seltener editieren als etwa einmal pro Sekunde
+EDIT_INTERVAL = 1.5
+PLACEHOLDER = "⏳ Denke nach …"
+
+
+async def _show(update: Update, messages: list, shown: list, text: str):
+    """Bringt die gesendeten Nachrichten auf den Stand von `text`; neue Teile werden nachgeschickt."""
+    for i, chunk in enumerate(split_message(text)):
+        if not chunk.strip():
+            continue
+        if i < len(messages):
+            if shown[i] != chunk:
+                await messages[i].edit_text(chunk)
+                shown[i] = chunk
+        else:
+            messages.append(await update.message.reply_text(chunk))
+            shown.append(chunk)
+
 
 async def frage(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
-        await update.message.reply_text("Bitte gib deine Frage ein, z. B. /frage Was ist BWV 1013?")
+        await update.message.reply_text("Bitte gib deine Frage ein, z. B. /frage Was ist BWV 1013?")
         return
 
     user_input = " ".join(context.args)
+    messages = [await update.message.reply_text(PLACEHOLDER)]
+    shown = [PLACEHOLDER]
+    text = ""
+    last_edit = time.monotonic()
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": user_input}]
-        )
+        chat_id = update.effective_chat.id
+        history = conversation_store.messages_for(chat_id, user_input)
+        async for piece in llm_gateway.stream(history, model="gpt-4"):
+            text += piece
+            if time.monotonic() - last_edit >= EDIT_INTERVAL:
+                # Zwischenstände sind optional; scheitert ein Edit (z. B. Flood-Limit), geht es weiter
+                try:
+                    await _show(update, messages, shown, text)
+                except Exception as e:
+                    print(f"⚠️ Zwischenstand nicht aktualisiert: {e}")
+                last_edit = time.monotonic()
 
-        if not response.choices or not response.choices[0].message:
-            await update.message.reply_text("Keine Antwort von GPT erhalten.")
+        if not text.strip():
+            await messages[0].edit_text("Keine Antwort von GPT erhalten.")
             return
-
-        reply = response.choices[0].message.content.strip()
-        await update.message.reply_text(reply[:4000])
+        await _show(update, messages, shown, text.strip())
+        await conversation_store.record(chat_id, user_input, text.strip())
     except Exception as e:
-        await update.message.reply_text(f"Fehler bei GPT: {e}")
+        error = f"Fehler bei GPT: {e}"
+        # Steht noch der Platzhalter da, wird er durch die Fehlermeldung ersetzt
+        if shown[0] == PLACEHOLDER:
+            try:
+                await messages[0].edit_text(error)
+                return
+            except Exception as edit_error:
+                print(f"⚠️ Platzhalter nicht aktualisiert: {edit_error}")
+        await update.message.reply_text(error)
+
+
+async def neu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Beginnt ein neues Gespräch ohne bisherigen Verlauf."""
+    await conversation_store.reset(update.effective_chat.id)
+    await update.message.reply_text("🧹 Gesprächsverlauf gelöscht.")
 
 gpt_handlers = [
-    CommandHandler("frage", frage)
+    CommandHandler("frage", frage),
+    CommandHandler("neu", neu),
 ]
@@ -0,0 +1,234 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from typing import Optional
+
+# === Einstellungen ===
+# Timeout je HTTP-Anfrage (requests, httplib2); eine Wiederholung muss samt Wartezeit hineinpassen
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+# Dienst -> (Anfragen pro Sekunde, Burst, max. Wiederholungen, Fehler bis zum Öffnen, Pause offen in s)
+POLICIES = {
+    "calendar": (10.0, 20, 3, 5, 60),
+    "gmail": (20.0, 40, 3, 5, 60),
+    "todoist": (0.5, 10, 3, 5, 120),
+    "coingecko": (0.4, 3, 2, 3, 300),
+    "openai": (1.0, 5, 3, 5, 120),
+}
+
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+# Gmail/Calendar melden Quota-Überschreitungen als 403 mit diesen Gründen
+RATE_LIMIT_REASONS = ("ratelimitexceeded", "userratelimitexceeded", "quotaexceeded")
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+_lock = threading.Lock()
+_local = threading.local()
+_buckets = {}
+_breakers = {}
+
+
+class CircuitOpenError(RuntimeError):
+    """Der Dienst ist nach wiederholten Fehlern vorübergehend gesperrt."""
+
+
+# === Token Bucket ===
+class TokenBucket:
+    """Erlaubt `rate` Anfragen pro Sekunde mit Spitzen bis `burst`; threadsicher."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Nimmt ein Token und liefert, wie lange der Aufrufer bis dahin warten muss."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+# === Circuit Breaker ===
+class CircuitBreaker:
+    """Nach `threshold` Fehlschlägen in Folge offen; nach `cooldown` Sekunden darf ein Versuch durch."""
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def check(self, service: str):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(f"{service}: nach wiederholten Fehlern pausiert (noch {remaining:.0f}s)")
+            # Halb offen: dieser Versuch entscheidet, ob der Dienst wieder freigegeben wird
+            self.opened_at = time.monotonic()
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def failure(self, service: str):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold and self.opened_at is None:
+                self.opened_at = time.monotonic()
+                print(f"🚧 {service}: {self.failures} Fehler in Folge, pausiere {self.cooldown:.0f}s.")
+
+
+def _state(service: str):
+    with _lock:
+        if service not in _buckets:
+            rate, burst, _, threshold, cooldown = POLICIES[service]
+            _buckets[service] = TokenBucket(rate, burst)
+            _breakers[service] = CircuitBreaker(threshold, cooldown)
+        return _buckets[service], _breakers[service]
+
+
+# === Fehlerklassifikation ===
+def _status(exc) -> Optional[int]:
+    """HTTP-Status aus requests-, googleapiclient- und openai-Fehlern."""
+    status = getattr(exc, "status_code", None)
+    if status is None and getattr(exc, "response", None) is not None:
+        status = getattr(exc.response, "status_code", None)
+    if status is None and getattr(exc, "resp", None) is not None:
+        status = getattr(exc.resp, "status", None)
+    return int(status) if status is not None else None
+
+
+def _headers(exc) -> dict:
+    if getattr(exc, "response", None) is not None and getattr(exc.response, "headers", None) is not None:
+        return exc.response.headers
+    if getattr(exc, "resp", None) is not None:
+        return exc.resp
+    return {}
+
+
+def retry_after(exc) -> Optional[float]:
+    value = _headers(exc).get("retry-after") or _headers(exc).get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(exc) -> bool:
+    if isinstance(exc, CircuitOpenError):
+        return False
+    status = _status(exc)
+    if status is not None:
+        if status == 403:
+            return any(reason in str(exc).lower() for reason in RATE_LIMIT_REASONS)
+        return status in RETRY_STATUS
+    # Verbindungs- und Timeout-Fehler (socket, requests, httplib2, openai) ohne HTTP-Antwort
+    name = type(exc).__name__.lower()
+    return isinstance(exc, (ConnectionError, TimeoutError)) or "timeout" in name or "connection" in name
+
+
+def backoff(attempt: int, exc) -> float:
+    """Exponentiell mit vollem Jitter; ein Retry-After des Servers hat Vorrang."""
+    server = retry_after(exc)
+    if server is not None:
+        return min(server, BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+# === Aufrufe ===
+def with_deadline(deadline: float, func, *args, **kwargs):
+    """Führt func aus; alle call()-Aufrufe darin wiederholen nur, solange es vor deadline fertig wird."""
+    previous = getattr(_local, "deadline", None)
+    _local.deadline = deadline
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _local.deadline = previous
+
+
+def deadline_left(wait: float, deadline: float = None) -> bool:
+    """True, wenn nach `wait` Sekunden eine weitere Anfrage (bis HTTP_TIMEOUT) noch vor die
+    (ggf. per with_deadline gesetzte) Frist passt."""
+    deadline = deadline or getattr(_local, "deadline", None)
+    return not deadline or time.monotonic() + wait + HTTP_TIMEOUT <= deadline
+
+
+def call(service: str, func, *args, deadline: float = None, **kwargs):
+    """Einzelne HTTP-Anfrage mit Rate-Limit, Wiederholungen und Circuit Breaker (blockierend).
+
+    Wird von google_services und http_session pro Anfrage verwendet, damit jede Anfrage ein
+    Token kostet und nur die fehlgeschlagene Anfrage wiederholt wird. Dienste ohne Eintrag in
+    POLICIES werden direkt ausgeführt. deadline (time.monotonic(), sonst die per with_deadline
+    gesetzte) verhindert Wiederholungen, die nicht mehr rechtzeitig fertig würden.
+    """
+    if service not in POLICIES:
+        return func(*args, **kwargs)
+    bucket, breaker = _state(service)
+    max_retries = POLICIES[service][2]
+    attempt = 0
+    while True:
+        breaker.check(service)
+        time.sleep(bucket.reserve())
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            wait = backoff(attempt, e)
+            if not is_retryable(e) or attempt >= max_retries or not deadline_left(wait, deadline):
+                if is_retryable(e):
+                    breaker.failure(service)
+                raise
+            print(f"🔁 {service}: {type(e).__name__}, neuer Versuch in {wait:.1f}s")
+            time.sleep(wait)
+            attempt += 1
+            continue
+        breaker.success()
+        return result
+
+
+async def call_async(service: str, func, *args, **kwargs):
+    """Wie call(), aber für Coroutine-Funktionen (z. B. AsyncOpenAI); wartet ohne den Event-Loop zu blockieren."""
+    bucket, breaker = _state(service)
+    max_retries = POLICIES[service][2]
+    attempt = 0
+    while True:
+        breaker.check(service)
+        await asyncio.sleep(bucket.reserve())
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e) or attempt >= max_retries:
+                if is_retryable(e):
+                    breaker.failure(service)
+                raise
+            wait = backoff(attempt, e)
+            print(f"🔁 {service}: {type(e).__name__}, neuer Versuch in {wait:.1f}s")
+            await asyncio.sleep(wait)
+            attempt += 1
+            continue
+        breaker.success()
+        return result
+
+
+def admit(service: str) -> float:
+    """Prüft den Circuit Breaker und reserviert ein Token; liefert die Wartezeit (für Streams)."""
+    bucket, breaker = _state(service)
+    breaker.check(service)
+    return bucket.reserve()
+
+
+def record(service: str, exc: Exception = None):
+    _, breaker = _state(service)
+    if exc is None:
+        breaker.success()
+    elif is_retryable(exc):
+        breaker.failure(service)
@@ -0,0 +1,188 @@
+import os
+import time
+import threading
+from array import array
+from typing import Optional
+
+import http_session
+import single_flight
+from async_io import HTTP_TIMEOUT
+from storage import data_path, load_json, save_json_atomic
+
+# === Einstellungen ===
+PRICE_URL = "https://api.coingecko.com/api/v3/simple/price"
+COINS = ("ripple", "hedera-hashgraph", "solana", "bitcoin", "ethereum")
+POLL_INTERVAL = float(os.getenv("PRICE_POLL_INTERVAL", "300"))
+HISTORY_SECONDS = 25 * 3600
+HISTORY_FILE = data_path("price_history.json")
+
+# Kurse älter als das gelten für /xrp als veraltet und werden direkt nachgeladen
+MAX_AGE = 2 * POLL_INTERVAL
+
+_lock = threading.Lock()
+_rings = {}       # Coin -> PriceRing
+_loaded = False
+
+
+# === Ringpuffer ===
+class PriceRing:
+    """Feste Anzahl (Zeitpunkt, Kurs)-Paare in zwei double-Arrays; der älteste Eintrag wird überschrieben."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.prices = array("d", bytes(8 * capacity))
+        self.start = 0
+        self.size = 0
+
+    def append(self, ts: float, price: float):
+        if self.size and ts <= self._time(self.size - 1):
+            return
+        pos = (self.start + self.size) % self.capacity
+        self.times[pos] = ts
+        self.prices[pos] = price
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def _time(self, i: int) -> float:
+        return self.times[(self.start + i) % self.capacity]
+
+    def _price(self, i: int) -> float:
+        return self.prices[(self.start + i) % self.capacity]
+
+    def latest(self):
+        if not self.size:
+            return None
+        return self._time(self.size - 1), self._price(self.size - 1)
+
+    def at_or_before(self, ts: float):
+        """Letzter Eintrag mit Zeitpunkt <= ts (binäre Suche, Einträge sind chronologisch)."""
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._time(mid) <= ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == 0:
+            return None
+        return self._time(lo - 1), self._price(lo - 1)
+
+    def items(self) -> list:
+        return [(self._time(i), self._price(i)) for i in range(self.size)]
+
+
+def _capacity() -> int:
+    return int(HISTORY_SECONDS // POLL_INTERVAL) + 2
+
+
+def _ring(coin: str) -> PriceRing:
+    ring = _rings.get(coin)
+    if ring is None:
+        ring = _rings[coin] = PriceRing(_capacity())
+    return ring
+
+
+# === Persistenz ===
+# {Coin: [[Zeitpunkt, Kurs], ...]} chronologisch
+def _load():
+    global _loaded
+    if _loaded:
+        return
+    stored = load_json(HISTORY_FILE, {}) or {}
+    cutoff = time.time() - HISTORY_SECONDS
+    for coin, entries in stored.items():
+        ring = _ring(coin)
+        for ts, price in entries:
+            if ts >= cutoff:
+                ring.append(ts, price)
+    _loaded = True
+
+
+def _save():
+    save_json_atomic(HISTORY_FILE, {coin: ring.items() for coin, ring in _rings.items()})
+
+
+# === Abruf ===
+def fetch_prices() -> dict:
+    response = http_session.session().get(
+        PRICE_URL,
+        params={"ids": ",".join(COINS), "vs_currencies": "usd"},
+        timeout=HTTP_TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def _poll_blocking():
+    prices = fetch_prices()
+    now = time.time()
+    with _lock:
+        _load()
+        for coin in COINS:
+            price = prices.get(coin, {}).get("usd")
+            if price is not None:
+                _ring(coin).append(now, float(price))
+        _save()
+
+
+async def poll():
+    """Holt einmal alle Kurse (Scheduler-Job, läuft alle POLL_INTERVAL Sekunden)."""
+    try:
+        await single_flight.shared_io("coingecko", "prices", _poll_blocking)
+    except Exception as e:
+        print(f"⚠️ Kursabruf fehlgeschlagen: {e}")
+
+
+# === Zugriff ===
+def _age() -> Optional[float]:
+    with _lock:
+        _load()
+        latest = [ring.latest() for ring in _rings.values() if ring.size]
+    if not latest:
+        return None
+    return time.time() - min(ts for ts, _ in latest)
+
+
+async def current_prices(max_age: float = MAX_AGE) -> dict:
+    """Coin -> {"usd", "change_1h", "change_24h"} aus dem Puffer; nur bei veraltetem Stand wird nachgeladen."""
+    age = _age()
+    if age is None or age > max_age:
+        await poll()
+    with _lock:
+        result = {}
+        for coin in COINS:
+            latest = _ring(coin).latest()
+            if latest is None:
+                continue
+            result[coin] = {
+                "usd": latest[1],
+                "change_1h": _change(coin, 3600),
+                "change_24h": _change(coin, 24 * 3600),
+            }
+    if not result:
+        raise RuntimeError("Keine Kursdaten verfügbar.")
+    return result
+
+
+def _change(coin: str, seconds: float) -> Optional[float]:
+    """Prozentuale Änderung gegenüber dem Kurs vor `seconds`; None, wenn die Historie nicht so weit reicht."""
+    ring = _ring(coin)
+    latest = ring.latest()
+    target = latest[0] - seconds
+    past = ring.at_or_before(target)
+    if past is None or target - past[0] > POLL_INTERVAL or not past[1]:
+        return None
+    return (latest[1] - past[1]) / past[1] * 100
+
+
+def format_change(change: Optional[float]) -> str:
+    return "–" if change is None else f"{change:+.1f} %"
+
+
+def price_line(prices: dict, coin: str) -> str:
+    entry = prices[coin]
+    return (f"{entry['usd']}\u202fUSD "
+            f"(1h {format_change(entry['change_1h'])}, 24h {format_change(entry['change_24h'])})")
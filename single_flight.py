@@ -0,0 +1,40 @@
+import asyncio
+
+from async_io import run_io
+
+# Schlüssel (Dienst, Operation, Bereich) -> laufender Abruf
+_inflight = {}
+
+# Wie oft ein Aufrufer sich an einen laufenden Abruf angehängt hat (je Dienst/Operation)
+stats = {}
+
+
+# === Zusammenlegen gleichzeitiger Abrufe ===
+async def do(key: tuple, func, *args, **kwargs):
+    """Führt die Coroutine-Funktion für einen Schlüssel nur einmal gleichzeitig aus.
+
+    Wer während eines laufenden Abrufs mit demselben Schlüssel kommt, wartet auf dessen
+    Ergebnis (bzw. dessen Fehler) statt einen eigenen zu starten. Alle Aufrufer erhalten
+    dasselbe Objekt und dürfen es deshalb nicht verändern. Abgeschlossene Abrufe werden
+    nicht gecacht.
+    """
+    task = _inflight.get(key)
+    if task is not None:
+        stats[key[:2]] = stats.get(key[:2], 0) + 1
+        return await asyncio.shield(task)
+
+    task = asyncio.ensure_future(func(*args, **kwargs))
+    _inflight[key] = task
+
+    def forget(done):
+        if _inflight.get(key) is done:
+            del _inflight[key]
+
+    task.add_done_callback(forget)
+    # shield: bricht ein Aufrufer ab (z. B. Timeout), laufen die anderen weiter
+    return await asyncio.shield(task)
+
+
+async def shared_io(service: str, operation: str, func, *args, scope=None):
+    """Blockierender Abruf über async_io.run_io, zusammengelegt nach (Dienst, Operation, Bereich)."""
+    return await do((service, operation, scope), run_io, service, func, *args)
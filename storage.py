@@ -0,0 +1,35 @@
+import os
+import json
+import tempfile
+
+# === Persistentes Verzeichnis (Fly.io-Volume unter /data) ===
+DATA_DIR = os.getenv("DATA_DIR") or ("/data" if os.path.isdir("/data") else ".")
+
+
+def data_path(name: str) -> str:
+    return os.path.join(DATA_DIR, name)
+
+
+def load_json(path: str, default=None):
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ {path} konnte nicht gelesen werden: {e}")
+        return default
+
+
+def save_json_atomic(path: str, data):
+    """Schreibt erst in eine temporäre Datei und ersetzt dann atomar, damit kein halber Stand liegen bleibt."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
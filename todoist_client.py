@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import datetime
+import threading
+
+import http_session
+import outbound_policy
+from async_io import HTTP_TIMEOUT
+
+# === Einstellungen ===
+REST_TASKS_URL = "https://api.todoist.com/rest/v2/tasks"
+SYNC_URL = "https://api.todoist.com/sync/v9/sync"
+CACHE_TTL = float(os.getenv("TODOIST_CACHE_TTL", "300"))
+FILTER_TTL = float(os.getenv("TODOIST_FILTER_TTL", "120"))
+# So lange darf bei gestörter API der letzte Stand weiter ausgeliefert werden
+STALE_MAX_AGE = float(os.getenv("TODOIST_STALE_MAX_AGE", str(24 * 3600)))
+
+_lock = threading.Lock()
+_tasks = {}          # id -> Aufgabe (in Todoist-Reihenfolge)
+_due_index = {}      # "YYYY-MM-DD" bzw. None (ohne Fälligkeit) -> Aufgaben
+_positions = {}      # id -> Position in Todoist-Reihenfolge
+_sync_token = "*"
+_synced_at = 0.0
+_filter_cache = {}   # Filter -> (Zeitpunkt, Aufgaben)
+
+# Wird bei jeder inhaltlichen Änderung erhöht (für abgeleitete Caches wie day_snapshot)
+version = 0
+
+
+def _headers() -> dict:
+    token = os.getenv("TODOIST_API_TOKEN")
+    if not token:
+        raise RuntimeError("Kein Todoist-Token gefunden.")
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _compact(task: dict) -> dict:
+    return {"id": task["id"], "content": task.get("content", "(kein Titel)"), "due": task.get("due")}
+
+
+def _rebuild_index():
+    _due_index.clear()
+    _positions.clear()
+    for position, task in enumerate(_tasks.values()):
+        _positions[task["id"]] = position
+        due = task.get("due")
+        due_date_str = due.get("date") if due else None
+        if due_date_str:
+            try:
+                key = datetime.date.fromisoformat(due_date_str[:10]).isoformat()
+            except ValueError:
+                continue
+        else:
+            key = None
+        _due_index.setdefault(key, []).append(task)
+
+
+# === Abgleich ===
+def _sync_incremental():
+    """Holt per Sync API nur die Änderungen seit dem letzten sync_token."""
+    global _sync_token
+    response = http_session.session().post(
+        SYNC_URL,
+        headers=_headers(),
+        data={"sync_token": _sync_token, "resource_types": json.dumps(["items"])},
+        timeout=HTTP_TIMEOUT,
+    )
+    response.raise_for_status()
+    result = response.json()
+
+    if result.get("full_sync"):
+        _tasks.clear()
+    for item in result.get("items", []):
+        if item.get("is_deleted") or item.get("checked"):
+            _tasks.pop(item["id"], None)
+        else:
+            _tasks[item["id"]] = _compact(item)
+    _sync_token = result.get("sync_token", _sync_token)
+    return bool(result.get("items")) or result.get("full_sync", False)
+
+
+def _load_full():
+    global _sync_token
+    response = http_session.session().get(REST_TASKS_URL, headers=_headers(), timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    _tasks.clear()
+    for task in response.json():
+        _tasks[task["id"]] = _compact(task)
+    _sync_token = "*"
+
+
+def refresh(max_age: float = CACHE_TTL):
+    """Aktualisiert den Cache, wenn er älter als max_age Sekunden ist (blockierend).
+
+    Vorübergehende Fehler (429, 5xx, Timeouts) wiederholt outbound_policy schon je Anfrage;
+    bleiben sie bestehen, wird bis STALE_MAX_AGE der letzte Stand weiter genutzt. Auf die
+    komplette REST-Liste wird nur ausgewichen, wenn die Sync API selbst nicht funktioniert.
+    """
+    global _synced_at, version
+    import requests
+    with _lock:
+        if time.monotonic() - _synced_at < max_age:
+            return
+        try:
+            try:
+                changed = _sync_incremental()
+            except (requests.RequestException, ValueError) as e:
+                if outbound_policy.is_retryable(e):
+                    raise
+                print(f"⚠️ Todoist Sync API fehlgeschlagen, lade komplette Liste: {e}")
+                _load_full()
+                changed = True
+        except (requests.RequestException, ValueError, outbound_policy.CircuitOpenError) as e:
+            if not _synced_at or time.monotonic() - _synced_at > STALE_MAX_AGE:
+                raise
+            print(f"⚠️ Todoist nicht erreichbar, nutze Stand von vor {(time.monotonic() - _synced_at) / 60:.0f} min: {e}")
+            return
+        if changed:
+            _rebuild_index()
+            version += 1
+        _synced_at = time.monotonic()
+
+
+# === Abfragen ===
+def get_tasks(max_age: float = CACHE_TTL) -> list:
+    """Alle offenen Aufgaben aus dem Cache."""
+    refresh(max_age)
+    with _lock:
+        return list(_tasks.values())
+
+
+def tasks_for_date(day: datetime.date, include_undated: bool = False, max_age: float = CACHE_TTL) -> list:
+    """Aufgaben mit Fälligkeit am Tag über den Datumsindex, optional samt Aufgaben ohne Datum."""
+    refresh(max_age)
+    with _lock:
+        tasks = list(_due_index.get(day.isoformat(), []))
+        if not include_undated:
+            return tasks
+        tasks += _due_index.get(None, [])
+        # Reihenfolge wie in Todoist beibehalten
+        tasks.sort(key=lambda t: _positions.get(t["id"], 0))
+    return tasks
+
+
+def query(filter_str: str, max_age: float = FILTER_TTL) -> list:
+    """Serverseitig gefilterte Aufgaben, z. B. 'today' oder 'due: 2026-10-20'."""
+    with _lock:
+        cached = _filter_cache.get(filter_str)
+    if cached and time.monotonic() - cached[0] < max_age:
+        return cached[1]
+
+    response = http_session.session().get(REST_TASKS_URL, headers=_headers(), params={"filter": filter_str}, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    tasks = [_compact(t) for t in response.json()]
+    with _lock:
+        _filter_cache[filter_str] = (time.monotonic(), tasks)
+    return tasks
+
+
+def get_relevant_tasks(start_date: datetime.date):
+    return get_relevant_tasks_by_day([start_date])[start_date]
+
+
+def get_relevant_tasks_by_day(dates) -> dict:
+    """Formatierte Aufgabenzeilen je Tag (fällige plus undatierte Aufgaben) für die Bot-Nachrichten."""
+    if not os.getenv("TODOIST_API_TOKEN"):
+        return {d: ["❌ Kein Todoist-Token gefunden."] for d in dates}
+
+    try:
+        refresh()
+    except Exception as e:
+        return {d: [f"❌ Fehler beim Laden der Todoist-Aufgaben:\n{e}"] for d in dates}
+
+    relevant = {}
+    for d in dates:
+        tasks = tasks_for_date(d, include_undated=True)
+        relevant[d] = [f"- [ ] {t['content']}" for t in tasks] or ["✅ Keine Aufgaben für diesen Tag."]
+    return relevant
+
+
+def invalidate():
+    global _synced_at
+    with _lock:
+        _synced_at = 0.0
+        _filter_cache.clear()
@@ -0,0 +1,209 @@
+import os
+import time
+import bisect
+import functools
+import threading
+
+# === Einstellungen ===
+# Prometheus-Endpunkt nur lokal (z. B. für fly-Metriken oder einen Sidecar); 0 schaltet ihn ab
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+METRIC_PREFIX = "morgenassistent"
+
+# Obergrenzen der Histogramm-Buckets in Sekunden
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+KIND_TITLES = {"handler": "Befehle", "job": "Jobs", "io": "Externe Aufrufe"}
+
+_lock = threading.Lock()
+# (Art, Name) -> Histogram
+_histograms = {}
+_server = None
+
+
+# === Histogramm ===
+class Histogram:
+    """Feste Buckets wie bei Prometheus; Quantile werden innerhalb des Buckets interpoliert."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.errors = 0
+        self.max = 0.0
+
+    def observe(self, seconds: float, error: bool = False):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        self.max = max(self.max, seconds)
+        if error:
+            self.errors += 1
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+def observe(kind: str, name: str, seconds: float, error: bool = False):
+    """Erfasst eine Dauer; kind ist "handler", "job" oder "io" (Dienst.Endpunkt)."""
+    with _lock:
+        histogram = _histograms.get((kind, name))
+        if histogram is None:
+            histogram = _histograms[(kind, name)] = Histogram()
+        histogram.observe(seconds, error)
+
+
+class span:
+    """Misst den umschlossenen Block: `with tracing.span("io", "openai.complete"): ...`"""
+
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.kind, self.name, time.perf_counter() - self.started, error=exc_type is not None)
+        return False
+
+
+def traced(kind: str, name: str):
+    """Dekorator für Coroutine-Funktionen (Telegram-Handler, Jobs)."""
+    def decorate(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(kind, name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def timed(kind: str, name: str, func, *args, **kwargs):
+    """Ruft func auf und misst die Dauer (für einzelne HTTP-Anfragen innerhalb von outbound_policy.call)."""
+    with span(kind, name):
+        return func(*args, **kwargs)
+
+
+# === Scheduler ===
+def trace_scheduler(scheduler):
+    """Misst jeden Joblauf über die Scheduler-Events, ohne die gespeicherten Job-Referenzen zu ändern."""
+    from apscheduler.events import EVENT_JOB_SUBMITTED, EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
+
+    started = {}
+
+    def listener(event):
+        if event.code == EVENT_JOB_SUBMITTED:
+            started[event.job_id] = time.perf_counter()
+            return
+        begin = started.pop(event.job_id, None)
+        if begin is not None:
+            observe("job", event.job_id, time.perf_counter() - begin, error=event.code == EVENT_JOB_ERROR)
+
+    scheduler.add_listener(listener, EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
+
+
+# === Auswertung ===
+def snapshot() -> dict:
+    """(Art, Name) -> {"count", "errors", "p50", "p95", "max"} in Sekunden."""
+    with _lock:
+        return {
+            key: {"count": h.count, "errors": h.errors, "p50": h.quantile(0.5),
+                  "p95": h.quantile(0.95), "max": h.max}
+            for key, h in _histograms.items()
+        }
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.0f} ms" if seconds < 10 else f"{seconds:.1f} s"
+
+
+def summary() -> str:
+    """p50/p95 je Operation, gruppiert nach Art (für /stats)."""
+    data = snapshot()
+    sections = []
+    for kind, title in KIND_TITLES.items():
+        rows = sorted((name, s) for (k, name), s in data.items() if k == kind)
+        if not rows:
+            continue
+        lines = [f"{title}:"]
+        for name, s in rows:
+            errors = f", {s['errors']} Fehler" if s["errors"] else ""
+            lines.append(f"{name}: {s['count']}×, p50 {_ms(s['p50'])}, p95 {_ms(s['p95'])}{errors}")
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections) or "Noch keine Messwerte."
+
+
+# === Prometheus ===
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text() -> str:
+    """Alle Histogramme im Prometheus-Textformat (Version 0.0.4)."""
+    metric = f"{METRIC_PREFIX}_duration_seconds"
+    errors = f"{METRIC_PREFIX}_errors_total"
+    lines = [
+        f"# HELP {metric} Dauer von Befehlen, Jobs und externen Aufrufen.",
+        f"# TYPE {metric} histogram",
+    ]
+    error_lines = [
+        f"# HELP {errors} Fehlgeschlagene Befehle, Jobs und externe Aufrufe.",
+        f"# TYPE {errors} counter",
+    ]
+    with _lock:
+        for (kind, name), h in sorted(_histograms.items()):
+            labels = f'kind="{_label(kind)}",name="{_label(name)}"'
+            cumulative = 0
+            for bound, n in zip(BUCKETS, h.counts):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {h.count}')
+            lines.append(f"{metric}_sum{{{labels}}} {h.total:.6f}")
+            lines.append(f"{metric}_count{{{labels}}} {h.count}")
+            error_lines.append(f"{errors}{{{labels}}} {h.errors}")
+    return "\n".join(lines + error_lines) + "\n"
+
+
+def start_exporter(host: str = METRICS_HOST, port: int = METRICS_PORT):
+    """Startet den /metrics-Endpunkt in einem Hintergrund-Thread (einmalig)."""
+    global _server
+    if _server is not None or not port:
+        return _server
+    import http.server
+
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    try:
+        _server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        print(f"⚠️ Metrik-Endpunkt auf {host}:{port} nicht verfügbar: {e}")
+        return None
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    print(f"📈 Metriken unter http://{host}:{port}/metrics")
+    return _server